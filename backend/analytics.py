@@ -1,105 +1,284 @@
-from collections import defaultdict
-from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Tuple
-
+import logging
+from operator import mul
+from datetime import datetime, time, timedelta, date
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, distinct, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from backend.database import Problem, Submission
+from backend.database import Problem, ProblemTopic, Submission, Topic, TopicStatsCache, engine
+
+logger = logging.getLogger(__name__)
+
+
+# Rows fetched per round trip when streaming submission rows
+_STREAM_BATCH_SIZE = 1000
+
+# Per-session memo for analytics results; sessions are request-scoped via get_db
+_CACHE_KEY = "analytics_cache"
+
+
+def _request_cache(db: Session) -> Dict[str, object]:
+    return db.info.setdefault(_CACHE_KEY, {})
+
+
+# Process-wide memo shared across requests: (version, day, expires_at, value) per
+# stat. Bumping the version (after a sync) invalidates everything; the day keeps
+# date-relative windows honest across midnight.
+_STATS_TTL_SECONDS = 300
+_stats_version = 0
+_stats_cache: Dict[str, Tuple[int, date, float, Any]] = {}
+
+
+def invalidate_stats_cache() -> None:
+    """Drop process-wide stats, e.g. after new submissions are synced."""
+    global _stats_version
+    _stats_version += 1
+    _stats_cache.clear()
+
+
+def _shared_stats(name: str, compute: Callable[[], Any]) -> Any:
+    today = date.today()
+    entry = _stats_cache.get(name)
+    if entry is not None:
+        version, day, expires_at, value = entry
+        if version == _stats_version and day == today and expires_at > monotonic():
+            return value
+    version = _stats_version
+    value = compute()
+    _stats_cache[name] = (version, today, monotonic() + _STATS_TTL_SECONDS, value)
+    return value
 
 
-def _get_time_windows(now: Optional[datetime] = None) -> Dict[str, datetime]:
+def _get_time_windows(now: Optional[datetime] = None) -> Dict[str, date]:
+    """Earliest solved_date inside each window, as plain dates.
+
+    A day counts when its midnight is at or after ``now - N days``, so the
+    cutoff rounds up past any time of day. Comparing dates to dates keeps the
+    per-row cast to timestamp out of the SQL bucketing.
+    """
     ref = now or datetime.now()
+    first_day = ref.date() if ref.time() == time.min else ref.date() + timedelta(days=1)
     return {
-        "3d": ref - timedelta(days=3),
-        "7d": ref - timedelta(days=7),
-        "14d": ref - timedelta(days=14),
-        "28d": ref - timedelta(days=28),
+        "3d": first_day - timedelta(days=3),
+        "7d": first_day - timedelta(days=7),
+        "14d": first_day - timedelta(days=14),
+        "28d": first_day - timedelta(days=28),
     }
 
 
-def _which_window(solved_date: date, windows: Dict[str, datetime]) -> str:
-    solved_dt = datetime.combine(solved_date, datetime.min.time())
-    if solved_dt >= windows["3d"]:
-        return "3d"
-    if solved_dt >= windows["7d"]:
-        return "7d"
-    if solved_dt >= windows["14d"]:
-        return "14d"
-    if solved_dt >= windows["28d"]:
-        return "28d"
-    return "28d+"
+# Stats key suffix for each recency bucket index returned by _window_bucket
+_WINDOW_SUFFIXES = ("3d", "7d", "14d", "28d", "28d_plus")
+_DIFFICULTY_INDEX = {"easy": 0, "medium": 1, "hard": 2}
+
+# Score weight = difficulty weight x recency multiplier, indexed [difficulty][window];
+# the 14-28d bucket is not scored
+_RECENCY_MULTIPLIER = (1.0, 0.8, 0.5, 0.0, 0.3)
+_DIFFICULTY_WEIGHT = (1, 2, 3)
+_SCORE_WEIGHTS = tuple(
+    tuple(diff_w * rec_mult for rec_mult in _RECENCY_MULTIPLIER) for diff_w in _DIFFICULTY_WEIGHT
+)
+
+# (TopicStats field, difficulty index, window index); the 14-28d bucket has no field
+_STAT_FIELDS = tuple(
+    (f"{diff}_{suffix}", diff_idx, window_idx)
+    for window_idx, suffix in enumerate(_WINDOW_SUFFIXES)
+    if suffix != "28d"
+    for diff_idx, diff in enumerate(_DIFFICULTY_INDEX)
+)
+
+# Per-topic counts live in one flat list, slot = difficulty * windows + window
+_N_WINDOWS = len(_WINDOW_SUFFIXES)
+_N_SLOTS = len(_DIFFICULTY_INDEX) * _N_WINDOWS
+_FIELD_SLOTS = tuple((field, diff_idx * _N_WINDOWS + window_idx) for field, diff_idx, window_idx in _STAT_FIELDS)
+# _SCORE_WEIGHTS in the same slot order, so a topic's score is one dot product
+_FLAT_SCORE_WEIGHTS = tuple(weight for row in _SCORE_WEIGHTS for weight in row)
+
+
+def _window_bucket(windows: Dict[str, date]):
+    """SQL CASE expression yielding the recency bucket index (0=3d .. 4=28d+)."""
+    return case(
+        (Submission.solved_date >= windows["3d"], 0),
+        (Submission.solved_date >= windows["7d"], 1),
+        (Submission.solved_date >= windows["14d"], 2),
+        (Submission.solved_date >= windows["28d"], 3),
+        else_=4,
+    )
+
+
+def _normalized_difficulty():
+    """SQL expression for lower(difficulty), defaulting unknown values to medium."""
+    lowered = func.lower(Problem.difficulty)
+    return case((lowered.in_(("easy", "medium", "hard")), lowered), else_="medium")
 
 
 def calculate_topic_stats(db: Session) -> List[Dict]:
-    """Calculate statistics for all topics across time windows with weighted scores."""
+    """Calculate statistics for all topics across time windows with weighted scores.
+
+    Served from topic_stats_cache while it matches today's date and the current
+    data version. A stale read recomputes the stats and stores them through
+    its own connection, so the caller's session is never committed.
+    """
+    cache = _request_cache(db)
+    if "topic_stats" not in cache:
+        cache["topic_stats"] = _shared_stats("topic_stats", lambda: _stored_topic_stats(db))
+    return cache["topic_stats"]
+
+
+def _stored_topic_stats(db: Session) -> List[Dict]:
+    # Read the version before computing: if data lands in between, the stored
+    # version is older than the stats and the next read simply recomputes
+    version = _topic_stats_data_version(db)
+    stats = _load_cached_topic_stats(db, version)
+    if stats is None:
+        stats = _compute_topic_stats(db)
+        try:
+            with engine.begin() as conn:
+                _write_topic_stats_cache(conn, stats, version)
+        except Exception:
+            logger.exception("Failed to store topic stats cache")
+    return stats
+
+
+def _topic_stats_data_version(db: Session) -> str:
+    """Fingerprint of the rows topic stats are computed from.
+
+    Changes whenever submissions are added or removed, a problem/topic link
+    is added, removed or moved, or a problem's difficulty changes, whichever
+    path (sync, importers, migrations) wrote them.
+    """
+    link_hash = func.hashtext(func.concat(ProblemTopic.problem_id, ":", ProblemTopic.topic_id))
+    difficulty_hash = func.hashtext(func.concat(Problem.id, ":", Problem.difficulty))
+    max_id, submissions, links, difficulties = db.execute(
+        select(
+            select(func.max(Submission.id)).scalar_subquery(),
+            select(func.count()).select_from(Submission).scalar_subquery(),
+            select(func.coalesce(func.sum(link_hash), 0)).scalar_subquery(),
+            select(func.coalesce(func.sum(difficulty_hash), 0)).scalar_subquery(),
+        )
+    ).one()
+    return f"{max_id or 0}:{submissions}:{links}:{difficulties}"
+
+
+def _load_cached_topic_stats(db: Session, version: str) -> Optional[List[Dict]]:
+    """Stored topic stats in weighted-score order, or None when missing, from an
+    earlier day, or computed against a different data version."""
+    rows = db.execute(
+        select(TopicStatsCache).order_by(TopicStatsCache.weighted_score.desc())
+    ).scalars().all()
+    if not rows:
+        return None
+    today = date.today()
+    if any(row.computed_on != today or row.data_version != version for row in rows):
+        return None
+    topic_stats: List[Dict] = []
+    for row in rows:
+        stats: Dict = {"topic": row.topic}
+        for field, _, _ in _STAT_FIELDS:
+            stats[field] = row.counts.get(field, 0)
+        stats["last_solved_date"] = row.last_solved_date
+        stats["weighted_score"] = row.weighted_score
+        topic_stats.append(stats)
+    return topic_stats
+
+
+def _write_topic_stats_cache(connection, topic_stats: List[Dict], version: str) -> None:
+    """Replace topic_stats_cache with topic_stats, stamped with today and version."""
+    today = date.today()
+    topics = [stats["topic"] for stats in topic_stats]
+    connection.execute(delete(TopicStatsCache).where(TopicStatsCache.topic.not_in(topics)))
+    if topic_stats:
+        stmt = pg_insert(TopicStatsCache).values([
+            {
+                "topic": stats["topic"],
+                "weighted_score": stats["weighted_score"],
+                "last_solved_date": stats["last_solved_date"],
+                "counts": {field: stats[field] for field, _, _ in _STAT_FIELDS},
+                "computed_on": today,
+                "data_version": version,
+                "updated_at": datetime.utcnow(),
+            }
+            for stats in topic_stats
+        ])
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[TopicStatsCache.topic],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("weighted_score", "last_solved_date", "counts", "computed_on", "data_version", "updated_at")
+            },
+        ))
+
+
+def refresh_topic_stats_cache(db: Session) -> List[Dict]:
+    """Recompute topic stats and upsert them into topic_stats_cache (caller commits)."""
+    version = _topic_stats_data_version(db)
+    topic_stats = _compute_topic_stats(db)
+    _write_topic_stats_cache(db, topic_stats, version)
+    # Called after new submissions are written; drop anything memoized before them
+    db.info.pop(_CACHE_KEY, None)
+    _request_cache(db)["topic_stats"] = topic_stats
+    return topic_stats
+
+
+def _compute_topic_stats(db: Session) -> List[Dict]:
     now = datetime.now()
     windows = _get_time_windows(now)
 
-    # Accumulators per topic
-    topic_acc: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    last_solved_by_topic: Dict[str, date] = {}
-
-    # Fetch submissions joined with problems to get difficulty and topics
-    # Filter for 2025 data only
-    submissions = (
-        db.query(Submission, Problem)
+    # Bucket each submission once in the database over the normalized topic
+    # tables, then group so only O(topics * difficulties * windows) rows come
+    # back. Filter for 2025 data only
+    bucketed = (
+        select(
+            Topic.name.label("topic"),
+            _normalized_difficulty().label("difficulty"),
+            _window_bucket(windows).label("window_idx"),
+            Submission.solved_date.label("solved_date"),
+        )
+        .select_from(Submission)
         .join(Problem, Submission.problem_id == Problem.id)
-        .filter(Submission.solved_date >= date(2025, 1, 1))
-        .all()
+        .join(ProblemTopic, ProblemTopic.problem_id == Problem.id)
+        .join(Topic, ProblemTopic.topic_id == Topic.id)
+        .where(Submission.solved_date >= date(2025, 1, 1))
+        .subquery()
+    )
+    grouped = (
+        select(
+            bucketed.c.topic,
+            bucketed.c.difficulty,
+            bucketed.c.window_idx,
+            func.count().label("solved"),
+            func.max(bucketed.c.solved_date).label("last_solved"),
+        )
+        .group_by(bucketed.c.topic, bucketed.c.difficulty, bucketed.c.window_idx)
     )
 
-    for submission, problem in submissions:
-        window_key = _which_window(submission.solved_date, windows)
-        difficulty = (problem.difficulty or "medium").lower()
-        # Ensure difficulty in expected set
-        if difficulty not in ("easy", "medium", "hard"):
-            difficulty = "medium"
-
-        for topic in (problem.topics or []):
-            topic_name = topic.strip()
-            if not topic_name:
-                continue
-
-            # Increment per-window, per-difficulty counters
-            topic_acc[topic_name][f"{difficulty}_{'28d_plus' if window_key=='28d+' else window_key}"] += 1
+    # One contiguous count array per topic instead of a dict keyed by tuples
+    counts_by_topic: Dict[str, List[int]] = {}
+    last_solved_by_topic: Dict[str, date] = {}
 
-            # Track last solved date
-            prev = last_solved_by_topic.get(topic_name)
-            if prev is None or submission.solved_date > prev:
-                last_solved_by_topic[topic_name] = submission.solved_date
+    for topic_name, difficulty, window_idx, solved, last_solved in db.execute(grouped):
+        diff_idx = _DIFFICULTY_INDEX[difficulty]
+        counts = counts_by_topic.get(topic_name)
+        if counts is None:
+            counts = counts_by_topic[topic_name] = [0] * _N_SLOTS
+        counts[diff_idx * _N_WINDOWS + window_idx] += solved
 
-    # Compute weighted scores
-    recency_multiplier = {"3d": 1.0, "7d": 0.8, "14d": 0.5, "28d+": 0.3}
-    difficulty_weight = {"easy": 1, "medium": 2, "hard": 3}
+        # Track last solved date
+        prev = last_solved_by_topic.get(topic_name)
+        if prev is None or last_solved > prev:
+            last_solved_by_topic[topic_name] = last_solved
 
     topic_stats: List[Dict] = []
-    for topic_name, counts in topic_acc.items():
+    for topic_name, last_solved in last_solved_by_topic.items():
         # Build response dict matching schemas.TopicStats
-        stats: Dict = {
-            "topic": topic_name,
-            "easy_3d": counts.get("easy_3d", 0),
-            "medium_3d": counts.get("medium_3d", 0),
-            "hard_3d": counts.get("hard_3d", 0),
-            "easy_7d": counts.get("easy_7d", 0),
-            "medium_7d": counts.get("medium_7d", 0),
-            "hard_7d": counts.get("hard_7d", 0),
-            "easy_14d": counts.get("easy_14d", 0),
-            "medium_14d": counts.get("medium_14d", 0),
-            "hard_14d": counts.get("hard_14d", 0),
-            "easy_28d_plus": counts.get("easy_28d_plus", 0),
-            "medium_28d_plus": counts.get("medium_28d_plus", 0),
-            "hard_28d_plus": counts.get("hard_28d_plus", 0),
-            "last_solved_date": last_solved_by_topic.get(topic_name),
-        }
-
-        # Weighted score across windows and difficulty
-        weighted = 0.0
-        for window_key, rec_mult in recency_multiplier.items():
-            suffix = "28d_plus" if window_key == "28d+" else window_key
-            for diff, diff_w in difficulty_weight.items():
-                weighted += stats.get(f"{diff}_{suffix}", 0) * diff_w * rec_mult
-
-        stats["weighted_score"] = round(weighted, 2)
+        stats: Dict = {"topic": topic_name}
+        counts = counts_by_topic[topic_name]
+        for field, slot in _FIELD_SLOTS:
+            stats[field] = counts[slot]
+        stats["last_solved_date"] = last_solved
+        stats["weighted_score"] = round(sum(map(mul, counts, _FLAT_SCORE_WEIGHTS)), 2)
         topic_stats.append(stats)
 
     # Sort topics by weighted score desc
@@ -107,127 +286,181 @@ def calculate_topic_stats(db: Session) -> List[Dict]:
     return topic_stats
 
 
+# Interned normalizations; the topic and difficulty vocabularies are tiny, so
+# each raw string is stripped/lowered once per process instead of once per row
+_TOPIC_CANON: Dict[str, str] = {}
+_TOPIC_KEYS: Dict[str, frozenset] = {}
+_DIFFICULTY_CANON: Dict[Optional[str], str] = {}
+
+
+def _topic_match_keys(items: List[str]) -> Set[str]:
+    """Case-insensitive topic keys, plus a simple singular form."""
+    s = set()
+    for it in items:
+        lo = (it or "").strip().lower()
+        if not lo:
+            continue
+        s.add(lo)
+        if lo.endswith("s"):
+            s.add(lo[:-1])
+    return s
+
+
+def _topic_keys(topic: str) -> frozenset:
+    """Interned match keys for a single topic name."""
+    keys = _TOPIC_KEYS.get(topic)
+    if keys is None:
+        keys = _TOPIC_KEYS[topic] = frozenset(_topic_match_keys([topic]))
+    return keys
+
+
 def get_recent_submissions_by_topics(db: Session, topics: List[str], days: int = 30) -> List[Dict]:
     """Return recent submissions joined with problems filtered by topics and 2025-only."""
     if not topics:
         return []
+    # Resolve the requested topics against the (small) topics table, so the
+    # problem filter below is an indexed problem_topics lookup
+    topic_set = _topic_match_keys(topics)
+    topic_ids = [
+        topic_id
+        for topic_id, name in db.execute(select(Topic.id, Topic.name))
+        if not topic_set.isdisjoint(_topic_keys(name.strip()))
+    ]
+    if not topic_ids:
+        return []
     cutoff = datetime.now().date() - timedelta(days=days)
-    rows = (
-        db.query(Submission, Problem)
+    rows = db.execute(
+        select(
+            Submission.solved_date,
+            Problem.leetcode_number,
+            Problem.title,
+            Problem.difficulty,
+            Problem.topics,
+            Problem.leetcode_url,
+        )
         .join(Problem, Submission.problem_id == Problem.id)
-        .filter(Submission.solved_date >= max(cutoff, date(2025, 1, 1)))
-        .all()
+        .where(Submission.solved_date >= max(cutoff, date(2025, 1, 1)))
+        .where(Problem.id.in_(
+            select(ProblemTopic.problem_id).where(ProblemTopic.topic_id.in_(topic_ids))
+        ))
+        # Server-side cursor: rows are converted as they stream in
+        .execution_options(yield_per=_STREAM_BATCH_SIZE)
     )
     results: List[Dict] = []
-    # Normalize requested topics: case-insensitive and simple singular form
-    def _norm_set(items: List[str]) -> set:
-        s = set()
-        for it in items:
-            lo = (it or "").strip().lower()
-            if not lo:
+    for solved_date, leetcode_number, title, difficulty, topics_raw, leetcode_url in rows:
+        problem_topics = []
+        for raw in (topics_raw or ()):
+            if not raw:
                 continue
-            s.add(lo)
-            if lo.endswith("s"):
-                s.add(lo[:-1])
-        return s
-    topic_set = _norm_set(topics)
-    for submission, problem in rows:
-        problem_topics = [t.strip() for t in (problem.topics or []) if t and t.strip()]
-        if not problem_topics:
-            continue
-        # Normalize problem topics similarly (case-insensitive + simple singular)
-        pnorm = _norm_set(problem_topics)
-        if topic_set.isdisjoint(pnorm):
-            continue
+            topic = _TOPIC_CANON.get(raw)
+            if topic is None:
+                topic = _TOPIC_CANON[raw] = raw.strip()
+            if topic:
+                problem_topics.append(topic)
+        diff = _DIFFICULTY_CANON.get(difficulty)
+        if diff is None:
+            diff = _DIFFICULTY_CANON[difficulty] = (difficulty or "medium").lower()
         results.append({
-            "leetcode_number": problem.leetcode_number,
-            "title": problem.title,
-            "difficulty": (problem.difficulty or "medium").lower(),
+            "leetcode_number": leetcode_number,
+            "title": title,
+            "difficulty": diff,
             "topics": problem_topics,
-            "leetcode_url": problem.leetcode_url,
-            "solved_date": submission.solved_date.isoformat(),
+            "leetcode_url": leetcode_url,
+            "solved_date": solved_date.isoformat(),
         })
     return results
 
 
 def calculate_overall_stats(db: Session) -> Dict:
     """Calculate overall statistics for the user."""
+    cache = _request_cache(db)
+    if "overall_stats" not in cache:
+        cache["overall_stats"] = _shared_stats("overall_stats", lambda: _compute_overall_stats(db))
+    return cache["overall_stats"]
+
+
+def _compute_overall_stats(db: Session) -> Dict:
     # Filter for 2025 data only
-    submissions = (
-        db.query(Submission, Problem)
+    since_2025 = Submission.solved_date >= date(2025, 1, 1)
+    difficulty = _normalized_difficulty()
+
+    total_submissions, total_attempts, easy_solved, medium_solved, hard_solved = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(func.coalesce(Submission.attempts, 1)), 0),
+            func.count().filter(difficulty == "easy"),
+            func.count().filter(difficulty == "medium"),
+            func.count().filter(difficulty == "hard"),
+        )
+        .select_from(Submission)
         .join(Problem, Submission.problem_id == Problem.id)
-        .filter(Submission.solved_date >= date(2025, 1, 1))
-        .all()
-    )
+        .where(since_2025)
+    ).one()
+
+    unique_topics = db.execute(
+        select(func.count(distinct(ProblemTopic.topic_id)))
+        .select_from(Submission)
+        .join(ProblemTopic, ProblemTopic.problem_id == Submission.problem_id)
+        .where(since_2025)
+    ).scalar_one()
+
+    # Streaks only need the distinct solved days
+    day_ordinals: Set[int] = {
+        solved_date.toordinal()
+        for solved_date in db.execute(
+            select(Submission.solved_date)
+            .where(since_2025)
+            .distinct()
+            .execution_options(yield_per=_STREAM_BATCH_SIZE)
+        ).scalars()
+    }
 
-    total_submissions = 0
-    total_attempts = 0
-    diff_counts = {"easy": 0, "medium": 0, "hard": 0}
-    unique_topics = set()
-    dates_set = set()
-
-    for submission, problem in submissions:
-        total_submissions += 1
-        total_attempts += (submission.attempts or 1)
-        difficulty = (problem.difficulty or "medium").lower()
-        if difficulty not in diff_counts:
-            difficulty = "medium"
-        diff_counts[difficulty] += 1
-        for topic in (problem.topics or []):
-            if topic and topic.strip():
-                unique_topics.add(topic.strip())
-        dates_set.add(submission.solved_date)
-
-    # Streaks based on dates_set
-    current_streak, longest_streak = _compute_streaks(dates_set)
+    # Streaks based on distinct solved days
+    current_streak, longest_streak = _compute_streaks(day_ordinals)
 
     average_attempts = round(total_attempts / total_submissions, 2) if total_submissions else 0.0
 
     return {
         "total_problems_solved": total_submissions,
         "total_attempts": total_attempts,
-        "easy_solved": diff_counts["easy"],
-        "medium_solved": diff_counts["medium"],
-        "hard_solved": diff_counts["hard"],
-        "unique_topics_practiced": len(unique_topics),
+        "easy_solved": easy_solved,
+        "medium_solved": medium_solved,
+        "hard_solved": hard_solved,
+        "unique_topics_practiced": unique_topics,
         "current_streak_days": current_streak,
         "longest_streak_days": longest_streak,
         "average_attempts_per_problem": average_attempts,
     }
 
 
-def _compute_streaks(dates_set: set) -> Tuple[int, int]:
-    if not dates_set:
+def _compute_streaks(day_ordinals: Set[int]) -> Tuple[int, int]:
+    """Return (current, longest) streaks from a set of date ordinals in O(N)."""
+    if not day_ordinals:
         return 0, 0
-    sorted_dates = sorted(dates_set)
-    longest = 1
-    current = 1
-    # Compute longest
-    for i in range(1, len(sorted_dates)):
-        if (sorted_dates[i] - sorted_dates[i - 1]).days == 1:
-            current += 1
-        else:
-            longest = max(longest, current)
-            current = 1
-    longest = max(longest, current)
+    # Only walk forward from days that start a run, so each day is visited once
+    longest = 0
+    for day in day_ordinals:
+        if day - 1 in day_ordinals:
+            continue
+        end = day + 1
+        while end in day_ordinals:
+            end += 1
+        longest = max(longest, end - day)
 
     # Compute current streak ending today
-    today = datetime.now().date()
+    today = datetime.now().date().toordinal()
     streak = 0
-    d = today
-    while d in dates_set:
+    while today - streak in day_ordinals:
         streak += 1
-        d = d - timedelta(days=1)
 
     return streak, longest
 
 
 def get_topic_stats_by_name(db: Session, topic: str) -> Optional[Dict]:
     """Return stats for a specific topic name, or None if not present."""
-    all_stats = calculate_topic_stats(db)
-    for t in all_stats:
-        if t.get("topic") == topic:
-            return t
-    return None
-
-
+    cache = _request_cache(db)
+    by_name = cache.get("topic_stats_by_name")
+    if by_name is None:
+        by_name = {t["topic"]: t for t in calculate_topic_stats(db)}
+        cache["topic_stats_by_name"] = by_name
+    return by_name.get(topic)
@@ -1,8 +1,16 @@
+import hashlib
 import json
 import logging
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 from dotenv import load_dotenv
 from backend.observability import start_trace, start_span, end_span
@@ -24,6 +32,204 @@ except Exception:
     Anthropic = None  # type: ignore
     Client = None  # type: ignore
 
+# Title -> LeetCode slug in one pass: spaces become hyphens, punctuation is dropped
+_SLUG_TABLE = str.maketrans({" ": "-", "(": None, ")": None, ",": None, ".": None, "'": None})
+
+
+# Shared keep-alive session for the HTTP fallback so warm calls skip the TLS handshake
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
+    global _http_session
+    # Reached from asyncio.to_thread workers; only first callers take the lock
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+                _http_session = session
+    return _http_session
+
+
+# Tokens spent per (user, day). The user is whoever the endpoint set in
+# usage_user before calling the client (contextvars follow asyncio.to_thread).
+usage_user: ContextVar[str] = ContextVar("claude_usage_user", default="system")
+_token_usage: Dict[Tuple[str, date], int] = {}
+_usage_lock = threading.Lock()
+
+_USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+
+def tokens_used_today(user: str) -> int:
+    """Tokens spent by user since local midnight."""
+    return _token_usage.get((user, date.today()), 0)
+
+
+def _record_token_usage(totals: Dict[str, int], text: str) -> None:
+    """Charge one response to the current usage_user.
+
+    Streams are closed as soon as the JSON is complete, usually before the
+    final output_tokens count arrives; message_start only reports a placeholder
+    count, so output is charged at least the estimate from the text.
+    """
+    totals["output_tokens"] = max(totals.get("output_tokens", 0), len(text) // 4)
+    key = (usage_user.get(), date.today())
+    with _usage_lock:
+        # Only today's entries matter; drop older days as they roll over
+        for stale in [k for k in _token_usage if k[1] != key[1]]:
+            del _token_usage[stale]
+        _token_usage[key] = _token_usage.get(key, 0) + sum(totals.values())
+
+
+def _note_usage(usage: object, totals: Dict[str, int]) -> None:
+    """Accumulate token counts from a message_start/message_delta usage block, logging cache hits."""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    for field in _USAGE_FIELDS:
+        value = get(field)
+        if isinstance(value, int):
+            totals[field] = value
+    if get("input_tokens") is not None:
+        logging.info(
+            "🤖 Prompt cache: created=%s read=%s input=%s",
+            get("cache_creation_input_tokens"),
+            get("cache_read_input_tokens"),
+            get("input_tokens"),
+        )
+
+
+def _cached_system(system: str) -> List[Dict]:
+    """System prompt as a single text block marked as a prompt-cache breakpoint."""
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+
+def _sse_text_deltas(lines: Iterable[str], totals: Dict[str, int]) -> Iterator[str]:
+    """Yield text deltas from Messages API server-sent event lines, collecting usage into totals."""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        try:
+            event = orjson.loads(line[5:])
+        except ValueError:
+            continue
+        event_type = event.get("type")
+        if event_type == "content_block_delta":
+            text = (event.get("delta") or {}).get("text")
+            if text:
+                yield text
+        elif event_type == "message_start":
+            _note_usage((event.get("message") or {}).get("usage"), totals)
+        elif event_type == "message_delta":
+            _note_usage(event.get("usage"), totals)
+        elif event_type == "error":
+            # e.g. overloaded_error mid-stream; surface it so _complete takes its error path
+            error = event.get("error") or {}
+            raise RuntimeError(f"Anthropic stream error ({error.get('type', 'unknown')}): {error.get('message', '')}")
+
+
+def _sdk_text_deltas(stream: Iterable, totals: Dict[str, int]) -> Iterator[str]:
+    """Yield text deltas from an SDK message stream, collecting usage into totals."""
+    for event in stream:
+        event_type = getattr(event, "type", None)
+        if event_type == "content_block_delta" and hasattr(event.delta, "text"):
+            yield event.delta.text
+        elif event_type == "message_start":
+            _note_usage(getattr(event.message, "usage", None), totals)
+        elif event_type == "message_delta":
+            _note_usage(getattr(event, "usage", None), totals)
+
+
+def _read_until_json_complete(chunks: Iterable[str]) -> str:
+    """Accumulate streamed text, returning as soon as the first top-level JSON object closes.
+
+    Anything the model writes after the object is never waited for; if the
+    stream ends first, the partial text is returned for _parse_response.
+    """
+    parts: List[str] = []
+    depth = 0
+    started = in_string = escaped = False
+    for chunk in chunks:
+        parts.append(chunk)
+        for ch in chunk:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = started
+            elif ch == "{":
+                depth += 1
+                started = True
+            elif ch == "}" and started:
+                depth -= 1
+                if depth == 0:
+                    return "".join(parts)
+    return "".join(parts)
+
+
+def _preview(value: object, limit: int = 500) -> str:
+    """Leading slice for span payloads without copying whole strings through str()."""
+    return value[:limit] if isinstance(value, str) else str(value)[:limit]
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_json_object(text: str) -> Optional[Dict]:
+    """The JSON object in a model response, or None when there isn't one."""
+    # Fast path: the whole response is a JSON object
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except ValueError:
+        pass
+
+    # Decode the first JSON object in one pass, skipping any prose before it
+    start = text.find("{")
+    if start >= 0:
+        try:
+            parsed, _ = _JSON_DECODER.raw_decode(text, start)
+            return parsed
+        except ValueError:
+            pass
+    return None
+
+
+# Completions keyed by a hash of (model, prompt); identical prompts skip the API round-trip
+_RESPONSE_CACHE_SIZE = 128
+_response_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+# Parsed topic decisions keyed on (stats, time, instructions), reused for a few minutes
+# so re-renders of the preview skip prompt building and parsing as well
+_DECISION_TTL_SECONDS = 300
+_DECISION_CACHE_SIZE = 64
+_decision_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+
+# Endpoints call the client from worker threads; guards both caches
+_cache_lock = threading.Lock()
+
+
+def clear_response_cache() -> None:
+    """Forget cached completions, e.g. after new submissions are synced."""
+    with _cache_lock:
+        _response_cache.clear()
+        _decision_cache.clear()
+
+
+def _decision_key(model: str, stats: List[Dict], time_minutes: int, custom_instructions: Optional[str]) -> str:
+    stats_json = orjson.dumps(stats, default=str, option=orjson.OPT_SORT_KEYS)
+    raw = b"|".join((model.encode(), stats_json, str(time_minutes).encode(), (custom_instructions or "").encode()))
+    return hashlib.sha256(raw).hexdigest()
+
 
 class ClaudeClient:
     """Thin wrapper around Anthropic Claude for generating daily plans."""
@@ -54,78 +260,153 @@ class ClaudeClient:
                     self.client = None
         # Prefer modern model; provide legacy fallback used by old SDKs
         self.model = model or "claude-sonnet-4-5-20250929"
+        # Topic selection is a small classification step; route it to a cheaper, faster model.
+        # Both tiers can be retuned via env without a code change.
+        self.topics_model = os.getenv("CLAUDE_TOPICS_MODEL") or "claude-haiku-4-5-20251001"
+        self.plan_model = os.getenv("CLAUDE_PLAN_MODEL") or self.model
         self.legacy_model = "claude-2"
 
+        # Pick the transport once instead of probing the client on every call
+        if self.client is not None and hasattr(self.client, "messages"):
+            self._send = self._send_messages
+        elif self.client is not None and hasattr(self.client, "completions"):
+            self._send = self._send_legacy
+        else:
+            self._send = self._send_http
+
+    def _send_messages(self, model: str, system: str, prompt: str) -> str:
+        stream = self.client.messages.create(  # type: ignore
+            model=model,
+            max_tokens=2000,
+            system=_cached_system(system),
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        totals: Dict[str, int] = {}
+        text = _read_until_json_complete(_sdk_text_deltas(stream, totals))
+        close = getattr(stream, "close", None)
+        if close is not None:
+            # Stop generation early once the JSON object is complete
+            close()
+        _record_token_usage(totals, text)
+        return text or "{}"
 
+    def _send_legacy(self, model: str, system: str, prompt: str) -> str:
+        hp = getattr(anthropic, "HUMAN_PROMPT", "\n\nHuman:")
+        ap = getattr(anthropic, "AI_PROMPT", "\n\nAssistant:")
+        # Text completions have no system prompt or prompt caching
+        legacy_prompt = f"{hp} {system}\n{prompt}{ap}"
+        response = self.client.completions.create(  # type: ignore
+            model=self.legacy_model,
+            max_tokens_to_sample=2000,
+            prompt=legacy_prompt,
+        )
+        text = getattr(response, "completion", "{}")
+        # No usage block on text completions; estimate both sides
+        _record_token_usage({"input_tokens": len(legacy_prompt) // 4}, text)
+        return text
+
+    def _api_headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+
+    def _send_http(self, model: str, system: str, prompt: str) -> str:
+        url = "https://api.anthropic.com/v1/messages"
+        headers = self._api_headers()
+        body = {
+            "model": model,
+            "max_tokens": 2000,
+            "system": _cached_system(system),
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        with _get_http_session().post(url, headers=headers, data=orjson.dumps(body), timeout=30, stream=True) as r:
+            r.raise_for_status()
+            totals: Dict[str, int] = {}
+            text = _read_until_json_complete(_sse_text_deltas(r.iter_lines(decode_unicode=True), totals))
+        _record_token_usage(totals, text)
+        return text or "{}"
+
+    def _complete(self, model: str, system: str, prompt: str, trace_name: str, time_minutes: int) -> str:
+        """Send prompt through the selected transport inside a Langfuse span; "{}" on failure."""
+        cache_key = hashlib.blake2b(f"{model}|{system}|{prompt}".encode(), digest_size=16).hexdigest()
+        with _cache_lock:
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                _response_cache.move_to_end(cache_key)
+        if cached is not None:
+            return cached
+
+        trace = start_trace(trace_name, metadata={"model": model, "time_minutes": time_minutes})
+        # Only build previews when tracing is active
+        call_span = None
+        if trace is not None:
+            call_span = start_span(trace, name="anthropic.messages", input={"prompt_preview": _preview(prompt), "model": model})
+        try:
+            content_text = self._send(model, system, prompt)
+        except Exception as e:
+            # Fallback to empty; parser will handle defaults
+            end_span(call_span, output={"error": str(e)}, level="ERROR")
+            return "{}"
+        if call_span is not None:
+            end_span(call_span, output={"preview": _preview(content_text)})
+
+        # Never pin an empty or unparseable reply; the next call should retry
+        if not _parse_json_object(content_text):
+            return content_text
+        with _cache_lock:
+            _response_cache[cache_key] = content_text
+            if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+        return content_text
 
     # Phase 7: Two-step generation helpers
-    def generate_topics_decision(self, stats: List[Dict], time_minutes: int, custom_instructions: Optional[str]) -> Dict:
+    def generate_topics_decision(
+        self,
+        stats: List[Dict],
+        time_minutes: int,
+        custom_instructions: Optional[str],
+        model: Optional[str] = None,
+    ) -> Dict:
         """Prompt 1: Decide topics using llm_prompts; return {new_topic, review_topics}."""
+        model = model or self.topics_model
+        decision_key = _decision_key(model, stats, time_minutes, custom_instructions)
+        with _cache_lock:
+            cached = _decision_cache.get(decision_key)
+            if cached is not None and cached[0] <= time.monotonic():
+                del _decision_cache[decision_key]
+                cached = None
+        if cached is not None:
+            logging.info("🤖 Reusing cached topics decision")
+            return dict(cached[1])
+
         # Lazy import to avoid circular
-        from backend.llm_prompts import build_prompt1_topic_decision
+        from backend.llm_prompts import TOPIC_DECISION_SYSTEM, build_prompt1_topic_decision
 
         prompt = build_prompt1_topic_decision(stats, time_minutes, custom_instructions)
-        logging.info(f"🤖 LLM Prompt for topics decision:\n{prompt}")
+        logging.info("🤖 LLM Prompt for topics decision:\n%s", prompt)
         
-        trace = start_trace("claude.generate_topics_decision", metadata={"model": self.model, "time_minutes": time_minutes})
-        call_span = start_span(trace, name="anthropic.messages", input={"prompt_preview": str(prompt)[:500], "model": self.model})
-        content_text = "{}"
-        try:
-            if self.client is not None and hasattr(self.client, "messages"):
-                response = self.client.messages.create(  # type: ignore
-                    model=self.model,
-                    max_tokens=2000,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                content_text = response.content[0].text if response and getattr(response, "content", None) else "{}"
-            elif self.client is not None and hasattr(self.client, "completions"):
-                hp = getattr(anthropic, "HUMAN_PROMPT", "\n\nHuman:")
-                ap = getattr(anthropic, "AI_PROMPT", "\n\nAssistant:")
-                legacy_prompt = f"{hp} {prompt}{ap}"
-                response = self.client.completions.create(  # type: ignore
-                    model=self.legacy_model,
-                    max_tokens_to_sample=2000,
-                    prompt=legacy_prompt,
-                )
-                content_text = getattr(response, "completion", "{}")
-            else:
-                url = "https://api.anthropic.com/v1/messages"
-                headers = {
-                    "x-api-key": self.api_key,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json",
-                }
-                body = {
-                    "model": self.model,
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}],
-                }
-                r = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
-                r.raise_for_status()
-                j = r.json()
-                parts = j.get("content") or []
-                if isinstance(parts, list) and parts:
-                    content_text = parts[0].get("text", "{}")
-                else:
-                    content_text = "{}"
-        except Exception as e:
-            # Fallback to empty; parser will handle defaults
-            content_text = "{}"
-            end_span(call_span, output={"error": str(e)}, level="ERROR")
-        else:
-            end_span(call_span, output={"preview": str(content_text)[:500]})
+        content_text = self._complete(model, TOPIC_DECISION_SYSTEM, prompt, "claude.generate_topics_decision", time_minutes)
         
-        logging.info(f"🤖 LLM Response for topics decision:\n{content_text}")
+        logging.info("🤖 LLM Response for topics decision:\n%s", content_text)
         
         parsed = self._parse_response(content_text)
-        logging.info(f"🤖 Parsed topics decision: {parsed}")
+        logging.info("🤖 Parsed topics decision: %s", parsed)
         
         # Ensure keys exist
         if "new_topic" not in parsed or not isinstance(parsed.get("review_topics"), list):
             fallback = {"new_topic": "Arrays", "review_topics": ["Two Pointers"]}
-            logging.warning(f"🤖 Using fallback topics decision: {fallback}")
+            logging.warning("🤖 Using fallback topics decision: %s", fallback)
             return fallback
-        return parsed
+
+        with _cache_lock:
+            _decision_cache[decision_key] = (time.monotonic() + _DECISION_TTL_SECONDS, parsed)
+            if len(_decision_cache) > _DECISION_CACHE_SIZE:
+                _decision_cache.popitem(last=False)
+        return dict(parsed)
 
     def generate_daily_plan_from_problems(
         self,
@@ -133,70 +414,24 @@ class ClaudeClient:
         problems: List[Dict],
         time_minutes: int,
         custom_instructions: Optional[str],
+        model: Optional[str] = None,
     ) -> Dict:
         """Prompt 2: Build plan from given problems and topic decision using llm_prompts."""
-        from backend.llm_prompts import build_prompt2_daily_plan
+        from backend.llm_prompts import DAILY_PLAN_SYSTEM, build_prompt2_daily_plan
 
         prompt = build_prompt2_daily_plan(topic_decision, problems, time_minutes, custom_instructions)
-        logging.info(f"🤖 LLM Prompt for daily plan:\n{prompt}")
+        logging.info("🤖 LLM Prompt for daily plan:\n%s", prompt)
         
-        if os.getenv("CLAUDE_DEBUG"):
-            # Print full prompt for debugging
-            print("[CLAUDE DEBUG] Prompt2 FULL:\n" + (prompt if isinstance(prompt, str) else str(prompt)))
-        trace = start_trace("claude.generate_daily_plan_from_problems", metadata={"model": self.model, "time_minutes": time_minutes})
-        call_span = start_span(trace, name="anthropic.messages", input={"prompt_preview": str(prompt)[:500], "model": self.model})
-        content_text = "{}"
-        try:
-            if self.client is not None and hasattr(self.client, "messages"):
-                response = self.client.messages.create(  # type: ignore
-                    model=self.model,
-                    max_tokens=2000,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                content_text = response.content[0].text if response and getattr(response, "content", None) else "{}"
-            elif self.client is not None and hasattr(self.client, "completions"):
-                hp = getattr(anthropic, "HUMAN_PROMPT", "\n\nHuman:")
-                ap = getattr(anthropic, "AI_PROMPT", "\n\nAssistant:")
-                legacy_prompt = f"{hp} {prompt}{ap}"
-                response = self.client.completions.create(  # type: ignore
-                    model=self.legacy_model,
-                    max_tokens_to_sample=2000,
-                    prompt=legacy_prompt,
-                )
-                content_text = getattr(response, "completion", "{}")
-            else:
-                url = "https://api.anthropic.com/v1/messages"
-                headers = {
-                    "x-api-key": self.api_key,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json",
-                }
-                body = {
-                    "model": self.model,
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}],
-                }
-                r = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
-                r.raise_for_status()
-                j = r.json()
-                parts = j.get("content") or []
-                if isinstance(parts, list) and parts:
-                    content_text = parts[0].get("text", "{}")
-                else:
-                    content_text = "{}"
-        except Exception:
-            content_text = "{}"
-            end_span(call_span, output={"error": "anthropic call failed"}, level="ERROR")
-        else:
-            end_span(call_span, output={"preview": str(content_text)[:500]})
+        content_text = self._complete(model or self.plan_model, DAILY_PLAN_SYSTEM, prompt, "claude.generate_daily_plan_from_problems", time_minutes)
         
-        logging.info(f"🤖 LLM Response for daily plan:\n{content_text}")
+        logging.info("🤖 LLM Response for daily plan:\n%s", content_text)
         
-        if os.getenv("CLAUDE_DEBUG"):
-            print("[CLAUDE DEBUG] Raw2:\n" + str(content_text)[:2000])
+        return self.finalize_daily_plan(topic_decision, content_text)
+
+    def finalize_daily_plan(self, topic_decision: Dict, content_text: str) -> Dict:
+        """Parse a Prompt 2 response and fill in the keys callers rely on."""
         parsed = self._parse_response(content_text)
-        logging.info(f"🤖 Parsed daily plan: {parsed}")
-        # Ensure required keys
+        logging.info("🤖 Parsed daily plan: %s", parsed)
         # Ensure required keys (old plan schema)
         if "recommendations" not in parsed or not isinstance(parsed.get("recommendations"), list):
             parsed["recommendations"] = []
@@ -205,26 +440,73 @@ class ClaudeClient:
         for rec in parsed["recommendations"]:
             rec.setdefault("estimated_minutes", 25)
             if not rec.get("leetcode_url") and rec.get("title"):
-                slug = (rec["title"].lower().replace(" ", "-").replace("(", "").replace(")", "").replace(",", "").replace(".", "").replace("'", ""))
+                slug = rec["title"].lower().translate(_SLUG_TABLE)
                 rec["leetcode_url"] = f"https://leetcode.com/problems/{slug}/description/"
         return parsed
 
+    # Message Batches API: half-price, asynchronous generation for plans nobody is waiting on
+    def build_daily_plan_request(
+        self,
+        custom_id: str,
+        topic_decision: Dict,
+        problems: List[Dict],
+        time_minutes: int,
+        custom_instructions: Optional[str],
+        model: Optional[str] = None,
+    ) -> Dict:
+        """One Prompt 2 entry for submit_batch()."""
+        from backend.llm_prompts import DAILY_PLAN_SYSTEM, build_prompt2_daily_plan
 
-    def _parse_response(self, text: str) -> Dict:
-        # Attempt direct JSON parse
-        try:
-            return json.loads(text)
-        except Exception:
-            pass
+        prompt = build_prompt2_daily_plan(topic_decision, problems, time_minutes, custom_instructions)
+        return {
+            "custom_id": custom_id,
+            "params": {
+                "model": model or self.plan_model,
+                "max_tokens": 2000,
+                "system": _cached_system(DAILY_PLAN_SYSTEM),
+                "messages": [{"role": "user", "content": prompt}],
+            },
+        }
+
+    def submit_batch(self, requests_: List[Dict]) -> str:
+        """Create a message batch and return its id."""
+        url = "https://api.anthropic.com/v1/messages/batches"
+        r = _get_http_session().post(url, headers=self._api_headers(), data=orjson.dumps({"requests": requests_}), timeout=30)
+        r.raise_for_status()
+        return r.json()["id"]
+
+    def batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """Map custom_id -> response text once the batch has ended; None while it is still processing.
+
+        Entries that errored or expired are left out.
+        """
+        session = _get_http_session()
+        headers = self._api_headers()
+        r = session.get(f"https://api.anthropic.com/v1/messages/batches/{batch_id}", headers=headers, timeout=30)
+        r.raise_for_status()
+        batch = r.json()
+        if batch.get("processing_status") != "ended" or not batch.get("results_url"):
+            return None
 
-        # Try to extract JSON block from text
-        start = text.find("{")
-        end = text.rfind("}")
-        if 0 <= start < end:
-            try:
-                return json.loads(text[start : end + 1])
-            except Exception:
-                pass
+        results: Dict[str, str] = {}
+        with session.get(batch["results_url"], headers=headers, timeout=60, stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                entry = orjson.loads(line)
+                result = entry.get("result") or {}
+                if result.get("type") != "succeeded":
+                    continue
+                content = (result.get("message") or {}).get("content") or []
+                results[entry["custom_id"]] = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+        return results
+
+
+    def _parse_response(self, text: str) -> Dict:
+        parsed = _parse_json_object(text)
+        if parsed is not None:
+            return parsed
 
         # Fallback minimal structure to avoid crashing callers
         return {
@@ -234,3 +516,16 @@ class ClaudeClient:
         }
 
 
+_claude_client: Optional[ClaudeClient] = None
+_claude_lock = threading.Lock()
+
+
+def get_claude() -> ClaudeClient:
+    """Return the process-wide ClaudeClient, creating it on first use."""
+    global _claude_client
+    # Lock-free once created; first callers from worker threads contend here
+    if _claude_client is None:
+        with _claude_lock:
+            if _claude_client is None:
+                _claude_client = ClaudeClient()
+    return _claude_client
@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, ForeignKey, Text, ARRAY
+from sqlalchemy import create_engine, event, delete, insert, text, Column, Integer, String, Date, DateTime, Float, ForeignKey, Text, ARRAY, Index, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -12,12 +15,32 @@ load_dotenv()
 # Database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://denamwangi@localhost:5432/leetcode_assistant")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Pool settings shared by both engines: pre-ping to skip dead connections, short
+# recycle, and a short checkout timeout so an exhausted pool fails fast (surfaced
+# as 503) instead of queueing requests
+POOL_OPTIONS = dict(
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_timeout=10,
+)
+
+# Requests run on the async engine; the sync engine only serves the import
+# scripts and startup, so it gets a small pool. Together they stay at 25
+# connections per process, well under Postgres's default max_connections=100.
+SYNC_POOL_SIZE = dict(pool_size=2, max_overflow=3)
+ASYNC_POOL_SIZE = dict(pool_size=10, max_overflow=10)
+
+# Create SQLAlchemy engine (import scripts and table creation)
+engine = create_engine(DATABASE_URL, **SYNC_POOL_SIZE, **POOL_OPTIONS)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the FastAPI app (asyncpg driver; same database as DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **ASYNC_POOL_SIZE, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -36,6 +59,12 @@ class Problem(Base):
     # Relationship to submissions
     submissions = relationship("Submission", back_populates="problem")
 
+    # Normalized topics; the topics array above stays the write path and is mirrored into problem_topics
+    topic_rows = relationship("Topic", secondary="problem_topics", viewonly=True)
+
+    # Analytics group by lower(difficulty)
+    __table_args__ = (Index("ix_problems_difficulty_lower", func.lower(difficulty)),)
+
 
 class Submission(Base):
     """User submission model"""
@@ -50,6 +79,38 @@ class Submission(Base):
     # Relationship to problem
     problem = relationship("Problem", back_populates="submissions")
 
+    # Join + date-range filter used by analytics
+    __table_args__ = (Index("ix_submissions_problem_id_solved_date", problem_id, solved_date),)
+
+
+class Topic(Base):
+    """Normalized topic tag"""
+    __tablename__ = "topics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class ProblemTopic(Base):
+    """Problem <-> topic association, mirrored from Problem.topics"""
+    __tablename__ = "problem_topics"
+
+    problem_id = Column(Integer, ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    topic_id = Column(Integer, ForeignKey("topics.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class TopicStatsCache(Base):
+    """Precomputed per-topic stats (schemas.TopicStats), refreshed on sync and on stale reads; importers clear it"""
+    __tablename__ = "topic_stats_cache"
+
+    topic = Column(String, primary_key=True)
+    weighted_score = Column(Float, nullable=False)
+    last_solved_date = Column(Date, nullable=True)
+    counts = Column(JSONB, nullable=False)  # {easy_3d: n, medium_3d: n, ...}
+    computed_on = Column(Date, nullable=False)  # Day the recency windows were evaluated against
+    data_version = Column(String, nullable=True)  # Fingerprint of submissions, topic links and difficulties the stats were computed from
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class DailyPlan(Base):
     """Daily study plan model"""
@@ -65,17 +126,95 @@ class DailyPlan(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+def sync_problem_topics(connection, problem_id: int, topics: Optional[List[str]]) -> None:
+    """Mirror a problem's topic array into the topics/problem_topics tables."""
+    sync_problem_topics_bulk(connection, {problem_id: topics})
+
+
+def sync_problem_topics_bulk(connection, topics_by_problem: Dict[int, Optional[List[str]]]) -> None:
+    """Mirror many problems' topic arrays in a fixed number of statements."""
+    if not topics_by_problem:
+        return
+    names_by_problem = {
+        problem_id: list(dict.fromkeys(t.strip() for t in (topics or []) if t and t.strip()))
+        for problem_id, topics in topics_by_problem.items()
+    }
+    connection.execute(delete(ProblemTopic).where(ProblemTopic.problem_id.in_(list(names_by_problem))))
+    all_names = list(dict.fromkeys(name for names in names_by_problem.values() for name in names))
+    if not all_names:
+        return
+    # No-op update so existing topics are RETURNed too, avoiding a follow-up SELECT
+    upsert = pg_insert(Topic).values([{"name": name} for name in all_names])
+    upsert = upsert.on_conflict_do_update(index_elements=["name"], set_={"name": upsert.excluded.name})
+    topic_ids = dict(connection.execute(upsert.returning(Topic.name, Topic.id)).all())
+    connection.execute(
+        insert(ProblemTopic).values([
+            {"problem_id": problem_id, "topic_id": topic_ids[name]}
+            for problem_id, names in names_by_problem.items()
+            for name in names
+        ])
+    )
+
+
+def upsert_problems(connection, problems: Dict[int, Dict[str, Any]]) -> Dict[int, int]:
+    """Bulk upsert problem rows keyed by leetcode_number; returns {leetcode_number: id}."""
+    if not problems:
+        return {}
+    stmt = pg_insert(Problem).values(list(problems.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Problem.leetcode_number],
+        set_={column: stmt.excluded[column] for column in ("title", "difficulty", "topics", "leetcode_url")},
+    ).returning(Problem.leetcode_number, Problem.id)
+    problem_ids = dict(connection.execute(stmt).all())
+
+    # Keep the normalized topic tables in step with the upserted arrays
+    sync_problem_topics_bulk(connection, {problem_ids[number]: row["topics"] for number, row in problems.items()})
+    return problem_ids
+
+
+def insert_submissions(connection, submissions: List[Dict[str, Any]], problem_ids: Dict[int, int]) -> int:
+    """Bulk insert submissions that reference their problem by leetcode_number."""
+    rows = [
+        {
+            "problem_id": problem_ids[submission["leetcode_number"]],
+            "solved_date": submission["solved_date"],
+            "attempts": submission["attempts"],
+        }
+        for submission in submissions
+        if submission["leetcode_number"] in problem_ids
+    ]
+    if rows:
+        connection.execute(insert(Submission), rows)
+    return len(rows)
+
+
+def clear_topic_stats_cache(connection) -> None:
+    """Drop precomputed topic stats after a bulk write; the next sync recomputes them."""
+    connection.execute(delete(TopicStatsCache))
+
+
+@event.listens_for(Problem, "after_insert")
+@event.listens_for(Problem, "after_update")
+def _mirror_problem_topics(mapper, connection, target):
+    """Keep problem_topics in step with ORM writes to Problem.topics."""
+    sync_problem_topics(connection, target.id, target.topics)
+
+
+async def get_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def create_tables():
     """Create all tables in the database"""
     Base.metadata.create_all(bind=engine)
+    # create_all doesn't add columns or indexes to existing tables; these came later
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE topic_stats_cache ADD COLUMN IF NOT EXISTS data_version VARCHAR"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_problems_difficulty_lower ON problems (lower(difficulty))"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_submissions_problem_id_solved_date ON submissions (problem_id, solved_date)"
+        ))
 
 
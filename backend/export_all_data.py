@@ -7,26 +7,88 @@ This fetches all submissions from your LeetCode account.
 import os
 import csv
 import json
-import requests
+import shelve
+import asyncio
+import aiohttp
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+GRAPHQL_URL = "https://leetcode.com/graphql/"
+
+# Transient statuses retried with exponential backoff
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
 class LeetCodeExporter:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, concurrency: int = 20, cache_path: str = "data/.slug_cache.db",
+                 max_retries: int = 5, backoff_factor: float = 0.5):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # titleSlug -> question details; problem metadata doesn't change, so no TTL
+        self.cache_path = cache_path
+        self._cache: Optional[shelve.Shelf] = None
+        # In-memory memo for this exporter, checked before the disk cache
+        self._details_cache: Dict[str, Dict[str, Any]] = {}
         self.session_cookie = os.getenv("LEETCODE_SESSION")
+        self.concurrency = concurrency
+        self._headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate"}
         
         if self.session_cookie:
-            self.session.cookies.set("LEETCODE_SESSION", self.session_cookie, domain="leetcode.com")
-            self.session.headers.update({"User-Agent": "leetcode-exporter/1.0"})
+            self._headers["User-Agent"] = "leetcode-exporter/1.0"
             print(f"🍪 Using LeetCode session cookie (length: {len(self.session_cookie)})")
         else:
             print("⚠️  No LEETCODE_SESSION cookie found - this will only work for public data")
     
-    def fetch_all_submissions(self, limit: int = 1000) -> List[Dict[str, Any]]:
+    def _lookup_details(self, title_slug: str) -> Optional[Dict[str, Any]]:
+        """Return cached details for a slug (memory first, then disk), or None"""
+        if title_slug in self._details_cache:
+            return self._details_cache[title_slug]
+        if self._cache is not None and title_slug in self._cache:
+            question = self._details_cache[title_slug] = self._cache[title_slug]
+            return question
+        return None
+    
+    def _remember_details(self, title_slug: str, question: Dict[str, Any]) -> None:
+        """Store a non-empty answer in both caches so missing problems are retried"""
+        if not question:
+            return
+        self._details_cache[title_slug] = question
+        if self._cache is not None:
+            self._cache[title_slug] = question
+    
+    def _open_session(self) -> aiohttp.ClientSession:
+        """Create the shared aiohttp session (must run inside the event loop)"""
+        jar = aiohttp.CookieJar()
+        if self.session_cookie:
+            jar.update_cookies({"LEETCODE_SESSION": self.session_cookie})
+        # Keep-alive pool sized to the request concurrency so TCP+TLS is reused
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency, keepalive_timeout=30)
+        return aiohttp.ClientSession(connector=connector, cookie_jar=jar, headers=self._headers)
+    
+    async def _post_graphql(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a GraphQL payload, retrying 429/5xx and connection errors with backoff"""
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff_factor * (2 ** attempt)
+            try:
+                async with self.session.post(GRAPHQL_URL, json=payload) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        raise Exception(f"GraphQL request failed: {response.status}")
+                    # Honour Retry-After when LeetCode rate-limits us
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(delay)
+        raise Exception("GraphQL request failed: retries exhausted")
+    
+    async def fetch_all_submissions(self, limit: int = 1000) -> List[Dict[str, Any]]:
         """Fetch all submissions from LeetCode GraphQL API"""
         query = """
         query recentAcSubmissions($username: String!, $limit: Int!) {
@@ -54,120 +116,93 @@ class LeetCodeExporter:
             "limit": limit
         }
         
-        response = self.session.post(
-            "https://leetcode.com/graphql/",
-            json={"query": query, "variables": variables},
-            headers={"Content-Type": "application/json"}
-        )
+        data = await self._post_graphql({"query": query, "variables": variables})
         
-        if response.status_code != 200:
-            raise Exception(f"GraphQL request failed: {response.status_code}")
-        
-        data = response.json()
         if "errors" in data:
             raise Exception(f"GraphQL errors: {data['errors']}")
         
         return data["data"]["recentAcSubmissionList"]
     
-    def fetch_problem_details(self, title_slug: str) -> Dict[str, Any]:
-        """Fetch detailed problem information"""
-        query = """
-        query questionData($titleSlug: String!) {
-            question(titleSlug: $titleSlug) {
-                questionId
-                questionFrontendId
-                title
-                difficulty
-                likes
-                dislikes
-                isLiked
-                similarQuestions
-                contributors {
-                    username
-                    profileUrl
-                    avatarUrl
-                    __typename
-                }
-                topicTags {
-                    name
-                    slug
-                    translatedName
-                    __typename
-                }
-                companyTagStats
-                codeSnippets {
-                    lang
-                    langSlug
-                    code
-                    __typename
-                }
-                stats
-                hints
-                solution {
-                    id
-                    canSeeDetail
-                    paidOnly
-                    __typename
-                }
-                status
-                sampleTestCase
-                metaData
-                judgerAvailable
-                judgeType
-                mysqlSchemas
-                enableRunCode
-                enableTestMode
-                enableDebugger
-                envInfo
-                libraryUrl
-                questionDetailUrl
-                __typename
-            }
-        }
-        """
-        
-        variables = {"titleSlug": title_slug}
+    async def _fetch_details_chunk(self, sem: asyncio.Semaphore, slugs: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch details for several problems in one POST using aliased GraphQL fields"""
+        params = ", ".join(f"$s{i}: String!" for i in range(len(slugs)))
+        fields = "\n".join(
+            f"    q{i}: question(titleSlug: $s{i}) {{ questionFrontendId difficulty topicTags {{ name }} }}"
+            for i in range(len(slugs))
+        )
+        query = f"query batch({params}) {{\n{fields}\n}}"
+        variables = {f"s{i}": slug for i, slug in enumerate(slugs)}
         
-        try:
-            response = self.session.post(
-                "https://leetcode.com/graphql/",
-                json={"query": query, "variables": variables},
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and data["data"]["question"]:
-                    return data["data"]["question"]
-        except Exception as e:
-            print(f"⚠️  Failed to fetch details for {title_slug}: {e}")
+        async with sem:
+            data = await self._post_graphql({"query": query, "variables": variables})
         
-        return {}
+        questions = data.get("data") or {}
+        return {slug: questions.get(f"q{i}") or {} for i, slug in enumerate(slugs)}
     
-    def export_to_csv(self, output_file: str = "data/historical.csv", limit: int = 1000):
-        """Export all data to CSV format"""
-        print(f"🔄 Fetching up to {limit} submissions...")
-        submissions = self.fetch_all_submissions(limit)
-        print(f"✅ Found {len(submissions)} submissions")
+    async def fetch_problem_details_batch(self, slugs: List[str], batch_size: int = 25) -> Dict[str, Dict[str, Any]]:
+        """Fetch problem details for many slugs, batch_size aliased queries per request"""
+        details: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for slug in dict.fromkeys(slugs):
+            cached = self._lookup_details(slug)
+            if cached is not None:
+                details[slug] = cached
+            else:
+                missing.append(slug)
+        slugs = missing
+        if details:
+            print(f"💾 {len(details)} problems loaded from cache")
         
-        # Get unique problems (deduplicate by title)
-        unique_problems = {}
-        for sub in submissions:
-            if sub["title"] not in unique_problems:
-                unique_problems[sub["title"]] = sub
+        sem = asyncio.Semaphore(self.concurrency)
+        chunks = [slugs[i:i + batch_size] for i in range(0, len(slugs), batch_size)]
+        results = await asyncio.gather(
+            *(self._fetch_details_chunk(sem, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
         
-        print(f"📊 Processing {len(unique_problems)} unique problems...")
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  Failed to fetch details for {len(chunk)} problems ({chunk[0]}...): {result}")
+                continue
+            details.update(result)
+            for slug, question in result.items():
+                self._remember_details(slug, question)
+        return details
+    
+    async def export_to_csv(self, output_file: str = "data/historical.csv", limit: int = 1000):
+        """Export all data to CSV format"""
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        self._cache = shelve.open(self.cache_path)
+        try:
+            async with self._open_session() as session:
+                self.session = session
+                print(f"🔄 Fetching up to {limit} submissions...")
+                submissions = await self.fetch_all_submissions(limit)
+                print(f"✅ Found {len(submissions)} submissions")
+            
+                # Get unique problems (deduplicate by title)
+                unique_problems = {}
+                for sub in submissions:
+                    if sub["title"] not in unique_problems:
+                        unique_problems[sub["title"]] = sub
+            
+                print(f"📊 Processing {len(unique_problems)} unique problems...")
+            
+                # Fetch detailed problem info in aliased batches, requests in flight concurrently
+                details = await self.fetch_problem_details_batch(
+                    [sub["titleSlug"] for sub in unique_problems.values()]
+                )
+                self.session = None
+        finally:
+            self._cache.close()
+            self._cache = None
         
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(['leetcode_number', 'title', 'difficulty', 'solved_date', 'attempts', 'topics'])
             
-            for i, (title, sub) in enumerate(unique_problems.items(), 1):
-                if i % 10 == 0:
-                    print(f"   Processed {i}/{len(unique_problems)} problems...")
-                
-                # Fetch detailed problem info
-                problem_details = self.fetch_problem_details(sub["titleSlug"])
+            for title, sub in unique_problems.items():
+                problem_details = details.get(sub["titleSlug"], {})
                 
                 # Extract data
                 leetcode_number = problem_details.get("questionFrontendId", "Unknown")
@@ -194,5 +229,4 @@ class LeetCodeExporter:
 
 if __name__ == "__main__":
     exporter = LeetCodeExporter()
-    exporter.export_to_csv(limit=1000)  # Adjust limit as needed
-
+    asyncio.run(exporter.export_to_csv(limit=1000))  # Adjust limit as needed
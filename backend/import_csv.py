@@ -12,26 +12,37 @@ If no file path is provided, it will look for data/historical.csv
 """
 
 import csv
+import logging
 import sys
 import os
-from datetime import datetime
+from datetime import date
 from pathlib import Path
 from typing import List, Dict, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+
+try:
+    from tqdm import tqdm  # type: ignore
+except Exception:
+    tqdm = None  # type: ignore
 
 # Add the current directory to Python path to import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import SessionLocal, create_tables, Problem, Submission
+from database import SessionLocal, clear_topic_stats_cache, create_tables, sync_problem_topics_bulk, Problem, Submission
+
+logger = logging.getLogger(__name__)
+
+# Expected column order; rows are unpacked positionally
+CSV_COLUMNS = ['leetcode_number', 'title', 'difficulty', 'solved_date', 'attempts', 'topics']
 
 
-def parse_csv_row(row: Dict[str, str]) -> tuple[Dict, Dict]:
+def parse_csv_row(row: List[str]) -> tuple[Dict, Dict]:
     """
     Parse a CSV row and return problem and submission data dictionaries.
     
     Args:
-        row: Dictionary with CSV row data
+        row: List of CSV fields in CSV_COLUMNS order
         
     Returns:
         Tuple of (problem_data, submission_data)
@@ -39,16 +50,20 @@ def parse_csv_row(row: Dict[str, str]) -> tuple[Dict, Dict]:
     Raises:
         ValueError: If required fields are missing or invalid
     """
+    if len(row) < len(CSV_COLUMNS):
+        raise ValueError(f"Missing required field: expected {len(CSV_COLUMNS)} columns, got {len(row)}")
+    
+    number_str, title, difficulty, solved_date_str, attempts_str, topics_str = row[:len(CSV_COLUMNS)]
+    
     try:
         # Parse basic fields
-        leetcode_number = int(row['leetcode_number'])
-        title = row['title'].strip()
-        difficulty = row['difficulty'].strip().lower()
-        solved_date = datetime.strptime(row['solved_date'], '%Y-%m-%d').date()
-        attempts = int(row['attempts'])
+        leetcode_number = int(number_str)
+        title = title.strip()
+        difficulty = difficulty.strip().lower()
+        solved_date = date.fromisoformat(solved_date_str)
+        attempts = int(attempts_str)
         
         # Parse topics (pipe-separated)
-        topics_str = row['topics'].strip()
         topics = [topic.strip() for topic in topics_str.split('|') if topic.strip()]
         
         # Validate difficulty
@@ -75,8 +90,6 @@ def parse_csv_row(row: Dict[str, str]) -> tuple[Dict, Dict]:
         
         return problem_data, submission_data
         
-    except KeyError as e:
-        raise ValueError(f"Missing required field: {e}")
     except ValueError as e:
         raise ValueError(f"Invalid data format: {e}")
 
@@ -108,57 +121,67 @@ def import_csv_data(csv_file_path: str) -> Dict[str, int]:
     db: Session = SessionLocal()
     
     try:
+        problem_rows: List[Dict] = []
+        submission_rows: List[Dict] = []
+        # Known problem numbers, loaded once; new ones are added as rows are queued
+        existing_numbers = {number for (number,) in db.query(Problem.leetcode_number).all()}
+        
         with open(csv_file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
+            reader = csv.reader(file)
+            
+            # Validate CSV headers once; rows are then unpacked by position
+            header = next(reader, [])
+            if header[:len(CSV_COLUMNS)] != CSV_COLUMNS:
+                raise ValueError(f"CSV must contain headers: {CSV_COLUMNS}")
             
-            # Validate CSV headers
-            required_headers = ['leetcode_number', 'title', 'difficulty', 'solved_date', 'attempts', 'topics']
-            if not all(header in reader.fieldnames for header in required_headers):
-                raise ValueError(f"CSV must contain headers: {required_headers}")
+            rows = enumerate(reader, start=2)  # Start at 2 because of header
+            show_bar = tqdm is not None and sys.stdout.isatty()
+            if show_bar:
+                rows = tqdm(rows, unit="row")
             
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 because of header
+            for row_num, row in rows:
+                if not show_bar and (row_num - 1) % 100 == 0:
+                    logger.info("Parsed %d rows...", row_num - 1)
+                
                 try:
                     # Parse the row
                     problem_data, submission_data = parse_csv_row(row)
                     
-                    # Check if problem already exists
-                    existing_problem = db.query(Problem).filter(
-                        Problem.leetcode_number == problem_data['leetcode_number']
-                    ).first()
-                    
-                    if existing_problem:
-                        print(f"Row {row_num}: Problem {problem_data['leetcode_number']} already exists, skipping...")
+                    # Check if problem already exists (in the DB or earlier in this file)
+                    if problem_data['leetcode_number'] in existing_numbers:
                         stats['problems_skipped'] += 1
                         continue
                     
-                    # Create problem
-                    db_problem = Problem(**problem_data)
-                    db.add(db_problem)
-                    db.flush()  # Get the ID without committing
-                    
-                    # Update submission with problem_id
-                    submission_data['problem_id'] = db_problem.id
-                    db_submission = Submission(**submission_data)
-                    db.add(db_submission)
-                    
-                    stats['problems_created'] += 1
-                    stats['submissions_created'] += 1
-                    
-                    print(f"Row {row_num}: Imported {problem_data['title']} (LeetCode #{problem_data['leetcode_number']})")
+                    existing_numbers.add(problem_data['leetcode_number'])
+                    problem_rows.append(problem_data)
+                    submission_rows.append(submission_data)
                     
                 except ValueError as e:
-                    print(f"Row {row_num}: Error - {e}")
-                    stats['errors'] += 1
-                    continue
-                except IntegrityError as e:
-                    print(f"Row {row_num}: Database error - {e}")
-                    db.rollback()
+                    logger.warning("Row %d: Error - %s", row_num, e)
                     stats['errors'] += 1
                     continue
+        
+        if problem_rows:
+            # One INSERT for all problems; ids come back via RETURNING, no flushes
+            problem_ids = dict(db.execute(
+                insert(Problem).values(problem_rows).returning(Problem.leetcode_number, Problem.id)
+            ).all())
+            
+            # Core inserts skip mapper events, so mirror the topics explicitly
+            sync_problem_topics_bulk(db.connection(), {
+                problem_ids[row['leetcode_number']]: row['topics'] for row in problem_rows
+            })
             
-            # Commit all changes
-            db.commit()
-            print(f"\n✅ Import completed successfully!")
+            for problem_data, submission_data in zip(problem_rows, submission_rows):
+                submission_data['problem_id'] = problem_ids[problem_data['leetcode_number']]
+            db.execute(insert(Submission), submission_rows)
+            clear_topic_stats_cache(db.connection())
+        
+        # Commit all changes in the one transaction
+        db.commit()
+        stats['problems_created'] = len(problem_rows)
+        stats['submissions_created'] = len(submission_rows)
+        print(f"\n✅ Import completed successfully!")
             
     except Exception as e:
         print(f"❌ Import failed: {e}")
@@ -185,6 +208,8 @@ def print_import_summary(stats: Dict[str, int]):
 
 def main():
     """Main function to run the CSV import."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Determine CSV file path
     if len(sys.argv) > 1:
         csv_file_path = sys.argv[1]
@@ -4,106 +4,150 @@ Script to import historical LeetCode data from CSV file into the database.
 """
 
 import csv
+import io
 import os
-from datetime import datetime
+from datetime import date
 from typing import List, Dict, Any
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from database import Problem, Submission, DATABASE_URL
+from sqlalchemy import text
+from database import clear_topic_stats_cache, engine, insert_submissions, sync_problem_topics_bulk, upsert_problems
 
 load_dotenv()
 
+# title -> titleSlug in one pass
+_SLUG_TABLE = str.maketrans({' ': '-', '(': None, ')': None, ',': None, '.': None, "'": None})
+
+# Fixed column order, checked once against the header
+CSV_COLUMNS = ['leetcode_number', 'title', 'difficulty', 'solved_date', 'attempts', 'topics']
+
+# Above this many submissions, stage rows with COPY instead of batched INSERTs
+COPY_THRESHOLD = 5000
+
+def _copy_rows(cursor, table: str, columns: List[str], rows) -> None:
+    """Stream rows into a table with COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)", buffer)
+
+def copy_import(conn, problems: Dict[int, Dict[str, Any]], submissions: List[Dict[str, Any]]) -> Dict[int, int]:
+    """Load problems and submissions through COPY into temp tables, then merge with two INSERT ... SELECTs"""
+    conn.execute(text("""
+        CREATE TEMP TABLE staging_problems (
+            leetcode_number integer, title text, difficulty text, topics text, leetcode_url text
+        ) ON COMMIT DROP
+    """))
+    conn.execute(text("""
+        CREATE TEMP TABLE staging_submissions (
+            leetcode_number integer, solved_date date, attempts integer
+        ) ON COMMIT DROP
+    """))
+    
+    # Raw DBAPI cursor on the same connection, so COPY runs inside our transaction
+    cursor = conn.connection.cursor()
+    try:
+        _copy_rows(cursor, "staging_problems", ["leetcode_number", "title", "difficulty", "topics", "leetcode_url"], (
+            (p["leetcode_number"], p["title"], p["difficulty"], "|".join(p["topics"]), p["leetcode_url"])
+            for p in problems.values()
+        ))
+        _copy_rows(cursor, "staging_submissions", ["leetcode_number", "solved_date", "attempts"], (
+            (s["leetcode_number"], s["solved_date"].isoformat(), s["attempts"]) for s in submissions
+        ))
+    finally:
+        cursor.close()
+    
+    problem_ids = dict(conn.execute(text("""
+        INSERT INTO problems (leetcode_number, title, difficulty, topics, leetcode_url)
+        SELECT leetcode_number, title, difficulty,
+               coalesce(string_to_array(nullif(topics, ''), '|'), '{}'), leetcode_url
+        FROM staging_problems
+        ON CONFLICT (leetcode_number) DO UPDATE SET
+            title = excluded.title,
+            difficulty = excluded.difficulty,
+            topics = excluded.topics,
+            leetcode_url = excluded.leetcode_url
+        RETURNING leetcode_number, id
+    """)).all())
+    
+    # Keep the normalized topic tables in step, as upsert_problems does
+    sync_problem_topics_bulk(conn, {problem_ids[number]: row["topics"] for number, row in problems.items()})
+    
+    # created_at is a client-side default on the model, so fill it here
+    conn.execute(text("""
+        INSERT INTO submissions (problem_id, solved_date, attempts, created_at)
+        SELECT problems.id, staging_submissions.solved_date, staging_submissions.attempts, timezone('utc', now())
+        FROM staging_submissions
+        JOIN problems ON problems.leetcode_number = staging_submissions.leetcode_number
+    """))
+    return problem_ids
+
 def import_historical_csv(csv_file: str = "../data/historical.csv"):
     """Import historical data from CSV file into database"""
     
     # Load CSV data
     print(f"📖 Loading data from {csv_file}...")
     
-    imported_problems = 0
-    imported_submissions = 0
+    # Problems keyed by leetcode_number (last row wins, like a row-by-row upsert)
+    problems: Dict[int, Dict[str, Any]] = {}
+    submissions: List[Dict[str, Any]] = []
     
-    # Connect to database
-    engine = create_engine(DATABASE_URL)
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if header[:len(CSV_COLUMNS)] != CSV_COLUMNS:
+            raise ValueError(f"CSV header must start with: {CSV_COLUMNS}")
+        
+        for row in reader:
+            # Skip empty rows
+            if not row or not row[0]:
+                continue
+            
+            # Extract data (topics may be missing on short rows)
+            number_str, title, difficulty, solved_date_str, attempts_str = row[:5]
+            leetcode_number = int(number_str)
+            difficulty = difficulty.lower()
+            solved_date = date.fromisoformat(solved_date_str)
+            attempts = int(attempts_str)
+            
+            # Parse topics (pipe-separated string)
+            topics_str = row[5] if len(row) > 5 else ''
+            topics = [topic.strip() for topic in topics_str.split('|') if topic.strip()]
+            
+            # Generate LeetCode URL (convert title to slug)
+            title_slug = title.lower().translate(_SLUG_TABLE)
+            leetcode_url = f"https://leetcode.com/problems/{title_slug}/description/"
+            
+            problems[leetcode_number] = {
+                "leetcode_number": leetcode_number,
+                "title": title,
+                "difficulty": difficulty,
+                "topics": topics,
+                "leetcode_url": leetcode_url
+            }
+            submissions.append({
+                "leetcode_number": leetcode_number,
+                "solved_date": solved_date,
+                "attempts": attempts
+            })
     
     with engine.connect() as conn:
         # Start transaction
         trans = conn.begin()
         
         try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                
-                for row in reader:
-                    # Skip empty rows
-                    if not row.get('leetcode_number'):
-                        continue
-                    
-                    # Extract data
-                    leetcode_number = int(row['leetcode_number'])
-                    title = row['title']
-                    difficulty = row['difficulty'].lower()
-                    solved_date = datetime.strptime(row['solved_date'], '%Y-%m-%d').date()
-                    attempts = int(row['attempts'])
-                    
-                    # Parse topics (pipe-separated string)
-                    topics_str = row.get('topics', '')
-                    topics = [topic.strip() for topic in topics_str.split('|') if topic.strip()]
-                    
-                    # Generate LeetCode URL (convert title to slug)
-                    title_slug = title.lower().replace(' ', '-').replace('(', '').replace(')', '').replace(',', '').replace('.', '').replace("'", '')
-                    leetcode_url = f"https://leetcode.com/problems/{title_slug}/description/"
-                    
-                    # Insert or update problem
-                    problem_query = text("""
-                        INSERT INTO problems (leetcode_number, title, difficulty, topics, leetcode_url)
-                        VALUES (:leetcode_number, :title, :difficulty, :topics, :leetcode_url)
-                        ON CONFLICT (leetcode_number) 
-                        DO UPDATE SET 
-                            title = EXCLUDED.title,
-                            difficulty = EXCLUDED.difficulty,
-                            topics = EXCLUDED.topics,
-                            leetcode_url = EXCLUDED.leetcode_url
-                    """)
-                    
-                    conn.execute(problem_query, {
-                        "leetcode_number": leetcode_number,
-                        "title": title,
-                        "difficulty": difficulty,
-                        "topics": topics,
-                        "leetcode_url": leetcode_url
-                    })
-                    imported_problems += 1
-                    
-                    # Get the problem ID for the submission
-                    problem_id_query = text("SELECT id FROM problems WHERE leetcode_number = :leetcode_number")
-                    result = conn.execute(problem_id_query, {"leetcode_number": leetcode_number})
-                    problem_row = result.fetchone()
-                    
-                    if problem_row:
-                        problem_id = problem_row[0]
-                        
-                        # Insert submission
-                        submission_query = text("""
-                            INSERT INTO submissions (problem_id, solved_date, attempts)
-                            VALUES (:problem_id, :solved_date, :attempts)
-                        """)
-                        
-                        conn.execute(submission_query, {
-                            "problem_id": problem_id,
-                            "solved_date": solved_date,
-                            "attempts": attempts
-                        })
-                        imported_submissions += 1
-                    
-                    if imported_problems % 20 == 0:
-                        print(f"   Processed {imported_problems} problems...")
+            if len(submissions) > COPY_THRESHOLD:
+                copy_import(conn, problems, submissions)
+            else:
+                problem_ids = upsert_problems(conn, problems)
+                insert_submissions(conn, submissions, problem_ids)
+            clear_topic_stats_cache(conn)
             
             # Commit transaction
             trans.commit()
             
             print(f"✅ Successfully imported:")
-            print(f"   📊 {imported_problems} problems")
-            print(f"   📝 {imported_submissions} submissions")
+            print(f"   📊 {len(problems)} problems")
+            print(f"   📝 {len(submissions)} submissions")
             
         except Exception as e:
             trans.rollback()
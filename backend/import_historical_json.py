@@ -3,117 +3,75 @@
 Script to import historical LeetCode data from JSON file into the database.
 """
 
-import json
 import os
-from datetime import datetime
+import ijson
+from datetime import date
 from typing import List, Dict, Any
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from database import Problem, Submission, DATABASE_URL
+from database import clear_topic_stats_cache, engine, insert_submissions, upsert_problems
 
 load_dotenv()
 
+# title -> titleSlug in one pass
+_SLUG_TABLE = str.maketrans({' ': '-', '(': None, ')': None, ',': None, '.': None, "'": None})
+
 def import_historical_data(json_file: str = "../data/historical.json"):
     """Import historical data from JSON file into database"""
     
     # Load JSON data
     print(f"📖 Loading data from {json_file}...")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
     
-    questions = data["data"]["userProgressQuestionList"]["questions"]
-    print(f"✅ Found {len(questions)} problems in JSON file")
+    # Stream question objects one at a time rather than loading the whole tree,
+    # keeping only solved 2025 entries (date prefix check, no parsing)
+    with open(json_file, 'rb') as f:
+        questions = ijson.items(f, 'data.userProgressQuestionList.questions.item')
+        solved = [
+            q for q in questions
+            if q.get("questionStatus") == "SOLVED" and q["lastSubmittedAt"].startswith("2025")
+        ]
+    
+    print(f"✅ Found {len(solved)} solved 2025 problems in JSON file")
+    
+    # Problems keyed by leetcode_number (last entry wins, like a row-by-row upsert)
+    problems: Dict[int, Dict[str, Any]] = {}
+    submissions: List[Dict[str, Any]] = []
     
-    # Connect to database
-    engine = create_engine(DATABASE_URL)
+    for question in solved:
+        # Extract problem data
+        leetcode_number = int(question["frontendId"])
+        title = question["title"]
+        
+        # Generate titleSlug from title (convert to lowercase, replace spaces with hyphens)
+        title_slug = title.lower().translate(_SLUG_TABLE)
+        
+        problems[leetcode_number] = {
+            "leetcode_number": leetcode_number,
+            "title": title,
+            "difficulty": question["difficulty"].lower(),
+            "topics": [tag["name"] for tag in question.get("topicTags", [])],
+            "leetcode_url": f"https://leetcode.com/problems/{title_slug}/description/"
+        }
+        submissions.append({
+            "leetcode_number": leetcode_number,
+            "solved_date": date.fromisoformat(question["lastSubmittedAt"][:10]),
+            "attempts": question["numSubmitted"]
+        })
     
     with engine.connect() as conn:
         # Start transaction
         trans = conn.begin()
         
         try:
-            imported_problems = 0
-            imported_submissions = 0
-            
-            for question in questions:
-                # Skip if not solved
-                if question.get("questionStatus") != "SOLVED":
-                    continue
-                
-                # Extract problem data
-                leetcode_number = int(question["frontendId"])
-                title = question["title"]
-                difficulty = question["difficulty"].lower()
-                last_submitted_at = question["lastSubmittedAt"]
-                num_submitted = question["numSubmitted"]
-                
-                # Extract topics
-                topics = []
-                if "topicTags" in question:
-                    topics = [tag["name"] for tag in question["topicTags"]]
-                
-                # Parse date
-                solved_date = datetime.fromisoformat(last_submitted_at.replace('Z', '+00:00')).date()
-                
-                # Only import 2025 data
-                if solved_date.year != 2025:
-                    continue
-                
-                # Generate titleSlug from title (convert to lowercase, replace spaces with hyphens)
-                title_slug = title.lower().replace(' ', '-').replace('(', '').replace(')', '').replace(',', '').replace('.', '').replace("'", '')
-                leetcode_url = f"https://leetcode.com/problems/{title_slug}/description/"
-                
-                # Insert or update problem
-                problem_query = text("""
-                    INSERT INTO problems (leetcode_number, title, difficulty, topics, leetcode_url)
-                    VALUES (:leetcode_number, :title, :difficulty, :topics, :leetcode_url)
-                    ON CONFLICT (leetcode_number) 
-                    DO UPDATE SET 
-                        title = EXCLUDED.title,
-                        difficulty = EXCLUDED.difficulty,
-                        topics = EXCLUDED.topics,
-                        leetcode_url = EXCLUDED.leetcode_url
-                """)
-                
-                conn.execute(problem_query, {
-                    "leetcode_number": leetcode_number,
-                    "title": title,
-                    "difficulty": difficulty,
-                    "topics": topics,
-                    "leetcode_url": leetcode_url
-                })
-                imported_problems += 1
-                
-                # Get the problem ID for the submission
-                problem_id_query = text("SELECT id FROM problems WHERE leetcode_number = :leetcode_number")
-                result = conn.execute(problem_id_query, {"leetcode_number": leetcode_number})
-                problem_row = result.fetchone()
-                
-                if problem_row:
-                    problem_id = problem_row[0]
-                    
-                    # Insert submission
-                    submission_query = text("""
-                        INSERT INTO submissions (problem_id, solved_date, attempts)
-                        VALUES (:problem_id, :solved_date, :attempts)
-                    """)
-                    
-                    conn.execute(submission_query, {
-                        "problem_id": problem_id,
-                        "solved_date": solved_date,
-                        "attempts": num_submitted
-                    })
-                imported_submissions += 1
-                
-                if imported_problems % 50 == 0:
-                    print(f"   Processed {imported_problems} problems...")
+            problem_ids = upsert_problems(conn, problems)
+            insert_submissions(conn, submissions, problem_ids)
+            clear_topic_stats_cache(conn)
             
             # Commit transaction
             trans.commit()
             
             print(f"✅ Successfully imported:")
-            print(f"   📊 {imported_problems} problems")
-            print(f"   📝 {imported_submissions} submissions")
+            print(f"   📊 {len(problems)} problems")
+            print(f"   📝 {len(submissions)} submissions")
             
         except Exception as e:
             trans.rollback()
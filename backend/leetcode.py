@@ -1,10 +1,70 @@
+import asyncio
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import random
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
+import orjson
 from dotenv import load_dotenv
 
+# Read .env once at import rather than on every client construction
+load_dotenv()
+
+# Process-wide titleSlug -> question metadata, least recently used evicted first.
+# Problem metadata doesn't change, so entries never expire; the bound covers
+# LeetCode's whole catalogue with room to spare.
+_META_CACHE_SIZE = 4096
+_META_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _cached_metas(title_slugs: List[str]) -> Dict[str, Dict]:
+    found: Dict[str, Dict] = {}
+    for slug in title_slugs:
+        meta = _META_CACHE.get(slug)
+        if meta is not None:
+            _META_CACHE.move_to_end(slug)
+            found[slug] = meta
+    return found
+
+
+def _remember_metas(metas: Dict[str, Dict]) -> None:
+    _META_CACHE.update(metas)
+    for slug in metas:
+        _META_CACHE.move_to_end(slug)
+    while len(_META_CACHE) > _META_CACHE_SIZE:
+        _META_CACHE.popitem(last=False)
+
+# Transient statuses worth retrying; anything else fails fast
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_ATTEMPTS = 3
+
+# LeetCode's difficulty labels, pre-lowered
+_DIFF_LOWER = {"Easy": "easy", "Medium": "medium", "Hard": "hard"}
+
+# GraphQL documents, built once and kept single-line to trim request bodies
+_QUESTION_FIELDS = "questionFrontendId title titleSlug difficulty topicTags { name }"
+_RECENT_AC_QUERY = (
+    "query recentAcSubmissions($username: String!) "
+    "{ recentAcSubmissionList(username: $username) { title titleSlug timestamp } }"
+)
+
+
+@lru_cache(maxsize=1024)
+def _ts_to_date(ts: int) -> date:
+    """Local solved date for a submission timestamp (repeats across syncs)."""
+    return date.fromtimestamp(ts)
+
+
+@lru_cache(maxsize=None)
+def _question_batch_query(size: int) -> str:
+    """Aliased q0..q{size-1} question() document for a batch of that size."""
+    params = ", ".join(f"$s{i}: String!" for i in range(size))
+    fields = " ".join(f"q{i}: question(titleSlug: $s{i}) {{ {_QUESTION_FIELDS} }}" for i in range(size))
+    return f"query questionDataBatch({params}) {{ {fields} }}"
+
 
 class LeetCodeClient:
     """Minimal LeetCode GraphQL client for fetching recent submissions.
@@ -13,16 +73,30 @@ class LeetCodeClient:
     For best results, set both LEETCODE_USERNAME and LEETCODE_SESSION in your .env.
     """
 
-    def __init__(self, username: Optional[str] = None, session_cookie: Optional[str] = None):
-        load_dotenv()
+    # Default per-request timeout, attached to the shared session once
+    _timeout = aiohttp.ClientTimeout(total=20)
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        session_cookie: Optional[str] = None,
+        year_filter: Optional[int] = 2025,
+        pool_size: int = 8,
+    ):
         self.base_url = "https://leetcode.com/graphql"
         self.username = username or os.getenv("LEETCODE_USERNAME")
         self.session_cookie = session_cookie or os.getenv("LEETCODE_SESSION")
+        # Only keep submissions solved in this year (None keeps everything)
+        self.year_filter = year_filter
+        # Max concurrent connections to leetcode.com; also bounds in-flight batches
+        self.pool_size = pool_size
 
         self._headers = {
             "User-Agent": "leetcode-assistant/1.0",
             "Referer": "https://leetcode.com/",
-            "Origin": "https://leetcode.com"
+            "Origin": "https://leetcode.com",
+            # Bodies are pre-serialized with orjson and sent as data=
+            "Content-Type": "application/json",
         }
         self._cookies = {}
         if self.session_cookie:
@@ -32,138 +106,203 @@ class LeetCodeClient:
         else:
             print(f"⚠️  No LEETCODE_SESSION cookie found - using public API")
 
+        # One pooled session for the client's lifetime (created lazily inside the event loop)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self._headers,
+                cookies=self._cookies,
+                timeout=self._timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    limit_per_host=self.pool_size,
+                    ttl_dns_cache=300,
+                    use_dns_cache=True,
+                    enable_cleanup_closed=True,
+                    keepalive_timeout=60,
+                ),
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "LeetCodeClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     async def fetch_recent_submissions(self, limit: int = 20) -> List[Dict]:
         """Fetch recent accepted submissions for the configured user.
 
         Returns a list of dicts with keys:
         - leetcode_number, title, difficulty, topics, leetcode_url, solved_date
         """
+        return [item async for item in self.iter_recent_submissions(limit)]
+
+    async def iter_recent_submissions(self, limit: int = 20) -> AsyncIterator[Dict]:
+        """Yield recent accepted submissions as their problem metadata arrives.
+
+        Same items as fetch_recent_submissions, but each one is yielded as soon as
+        its metadata batch completes (cached problems first), so callers can start
+        work before every request has returned.
+        """
         if not self.username:
             # Graceful fallback when username is not provided
             print(f"⚠️  No LEETCODE_USERNAME configured. Set it in .env for best results.")
-            return []
+            return
 
         # Step 1: Fetch recent accepted submissions (titleSlug + timestamp)
         # LeetCode public GraphQL: recentAcSubmissionList
         submissions = await self._fetch_recent_ac_submissions(limit)
 
-        # Step 2: For each titleSlug, fetch problem metadata (number, difficulty, tags)
-        results: List[Dict] = []
         print(f"📊 Fetched {len(submissions)} submissions from LeetCode")
-        
+
+        # Apply the year filter from timestamps alone, before any metadata is
+        # fetched. The list is newest-first, so the first older year ends the scan.
+        # Resubmissions repeat slugs; group them so each problem is fetched once.
+        by_slug: Dict[str, List[Tuple[Dict, date]]] = {}
         for sub in submissions:
-            meta = await self._fetch_problem_meta(sub.get("titleSlug"))
-            if not meta:
-                print(f"⚠️  No metadata for {sub.get('titleSlug')}")
-                continue
-            # Handle leetcode_number conversion safely
-            try:
-                leetcode_number = int(meta["questionFrontendId"])
-            except (ValueError, TypeError) as e:
-                print(f"⚠️  Could not parse leetcode_number '{meta.get('questionFrontendId')}': {e}")
-                continue  # Skip if we can't parse the number
-            
-            # Safely parse timestamp (LeetCode returns it as a string)
+            # Safely parse timestamp (LeetCode returns it as a digit string)
             raw_ts = sub.get("timestamp", 0)
-            try:
-                ts_int = int(raw_ts)
-            except (ValueError, TypeError):
-                ts_int = 0
-
-            solved_date = datetime.fromtimestamp(ts_int).date()
-            
-            # Only include 2025 data
-            if solved_date.year != 2025:
-                continue
-                
-            results.append(
-                {
-                    "leetcode_number": leetcode_number,
-                    "title": meta["title"],
-                    "difficulty": meta["difficulty"].lower(),
-                    "topics": [t["name"] for t in meta.get("topicTags", [])] or ["Unknown"],
-                    "leetcode_url": f"https://leetcode.com/problems/{meta['titleSlug']}/description/",
-                    "solved_date": solved_date,
-                }
-            )
+            if isinstance(raw_ts, int):
+                ts_int = raw_ts
+            else:
+                raw_ts = str(raw_ts)
+                ts_int = int(raw_ts) if raw_ts.isdigit() else 0
+
+            solved_date = _ts_to_date(ts_int)
 
-        # De-duplicate by (leetcode_number, solved_date)
-        seen = set()
-        unique_results: List[Dict] = []
-        for item in results:
-            key = (item["leetcode_number"], item["solved_date"])
-            if key in seen:
+            if self.year_filter is not None and solved_date.year != self.year_filter:
+                # Unparseable timestamps (0) are skipped without ending the scan
+                if ts_int and solved_date.year < self.year_filter:
+                    break
+                continue
+            slug = sub.get("titleSlug")
+            if not slug:
+                print(f"⚠️  No metadata for {slug}")
                 continue
-            seen.add(key)
-            unique_results.append(item)
+            by_slug.setdefault(slug, []).append((sub, solved_date))
+
+        # Step 2: Fetch problem metadata (number, difficulty, tags) in aliased
+        # GraphQL batches, converting each batch as soon as it lands
+        # De-duplicate by (leetcode_number, solved_date), keeping the first item;
+        # setdefault does the membership test and insert in one hash lookup
+        seen: Dict[Tuple[int, date], Dict] = {}
+        async for metas in self._iter_problem_meta_batches(list(by_slug)):
+            for slug, meta in metas.items():
+                for sub, solved_date in by_slug.pop(slug, ()):
+                    item = self._to_submission(meta, solved_date)
+                    if item is None:
+                        continue
+                    if seen.setdefault((item["leetcode_number"], item["solved_date"]), item) is item:
+                        yield item
+
+        for slug in by_slug:
+            print(f"⚠️  No metadata for {slug}")
+
+    @staticmethod
+    def _to_submission(meta: Dict, solved_date: date) -> Optional[Dict]:
+        """Build a submission dict from problem metadata, or None if the id is unusable."""
+        # Handle leetcode_number conversion safely
+        frontend_id = meta.get("questionFrontendId")
+        if isinstance(frontend_id, int):
+            leetcode_number = frontend_id
+        elif isinstance(frontend_id, str) and frontend_id.isdigit():
+            leetcode_number = int(frontend_id)
+        else:
+            print(f"⚠️  Could not parse leetcode_number '{frontend_id}'")
+            return None  # Skip if we can't parse the number
+
+        difficulty = meta["difficulty"]
+        tags = meta.get("topicTags")
+        return {
+            "leetcode_number": leetcode_number,
+            "title": meta["title"],
+            "difficulty": _DIFF_LOWER.get(difficulty) or difficulty.lower(),
+            "topics": [t["name"] for t in tags] if tags else ["Unknown"],
+            "leetcode_url": f"https://leetcode.com/problems/{meta['titleSlug']}/description/",
+            "solved_date": solved_date,
+        }
 
-        return unique_results
+    async def _post_graphql(self, query: Dict) -> Optional[Dict]:
+        """POST a GraphQL query, retrying transient failures with backoff.
+
+        Returns the decoded response, or None once retries are exhausted or the
+        error isn't transient.
+        """
+        session = await self._get_session()
+        body = orjson.dumps(query)
+        for attempt in range(_MAX_ATTEMPTS):
+            last = attempt == _MAX_ATTEMPTS - 1
+            try:
+                async with session.post(self.base_url, data=body) as resp:
+                    if resp.status in _RETRY_STATUSES and not last:
+                        # Respect Retry-After on 429s, otherwise jittered exponential backoff
+                        retry_after = resp.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else min(2 ** attempt, 8) + random.random()
+                        await asyncio.sleep(min(delay, 8))
+                        continue
+                    resp.raise_for_status()
+                    return await resp.json(loads=orjson.loads)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last:
+                    return None
+                await asyncio.sleep(2 ** attempt)
+            except Exception:
+                return None
+        return None
 
     async def _fetch_recent_ac_submissions(self, limit: int) -> List[Dict]:
         query = {
             "operationName": "recentAcSubmissions",
             "variables": {"username": self.username},
-            "query": (
-                "query recentAcSubmissions($username: String!) {\n"
-                "  recentAcSubmissionList(username: $username) {\n"
-                "    title\n"
-                "    titleSlug\n"
-                "    timestamp\n"
-                "  }\n"
-                "}"
-            ),
+            "query": _RECENT_AC_QUERY,
         }
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url, 
-                    json=query, 
-                    headers=self._headers,
-                    cookies=self._cookies,
-                    timeout=aiohttp.ClientTimeout(total=20)
-                ) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    items = (data.get("data", {}) or {}).get("recentAcSubmissionList", [])
-                    if not isinstance(items, list):
-                        return []
-                    # Limit and map
-                    return items[: max(1, min(limit, 50))]
-        except Exception:
+        data = await self._post_graphql(query)
+        if not isinstance(data, dict):
             return []
+        items = (data.get("data", {}) or {}).get("recentAcSubmissionList", [])
+        if not isinstance(items, list):
+            return []
+        # Limit and map
+        return items[: max(1, min(limit, 50))]
 
-    async def _fetch_problem_meta(self, title_slug: Optional[str]) -> Optional[Dict]:
-        if not title_slug:
-            return None
-        query = {
-            "operationName": "questionData",
-            "variables": {"titleSlug": title_slug},
-            "query": (
-                "query questionData($titleSlug: String!) {\n"
-                "  question(titleSlug: $titleSlug) {\n"
-                "    questionFrontendId\n"
-                "    title\n"
-                "    titleSlug\n"
-                "    difficulty\n"
-                "    topicTags { name }\n"
-                "  }\n"
-                "}"
-            ),
-        }
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url, 
-                    json=query, 
-                    headers=self._headers,
-                    cookies=self._cookies,
-                    timeout=aiohttp.ClientTimeout(total=20)
-                ) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    q = (data.get("data", {}) or {}).get("question")
-                    return q
-        except Exception:
-            return None
+    async def _iter_problem_meta_batches(self, title_slugs: List[str], chunk_size: int = 25) -> AsyncIterator[Dict[str, Dict]]:
+        """Yield {slug: meta} dicts: cached entries first, then each batch as it completes."""
+        cached = _cached_metas(title_slugs)
+        if cached:
+            yield cached
+        missing = [slug for slug in title_slugs if slug not in cached]
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        sem = asyncio.Semaphore(self.pool_size)
 
+        async def one(chunk: List[str]) -> Dict[str, Dict]:
+            query = {
+                "operationName": "questionDataBatch",
+                "variables": {f"s{i}": slug for i, slug in enumerate(chunk)},
+                "query": _question_batch_query(len(chunk)),
+            }
+            async with sem:
+                data = await self._post_graphql(query)
+            if not isinstance(data, dict):
+                return {}
+            questions = data.get("data", {}) or {}
+            return {slug: questions.get(f"q{i}") for i, slug in enumerate(chunk) if questions.get(f"q{i}")}
 
+        tasks = [asyncio.create_task(one(chunk)) for chunk in chunks]
+        try:
+            for done in asyncio.as_completed(tasks):
+                part = await done
+                _remember_metas(part)
+                yield part
+        finally:
+            # Consumer stopped early: don't leave requests running
+            for task in tasks:
+                task.cancel()
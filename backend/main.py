@@ -1,13 +1,26 @@
-# (moved routes below app initialization)
 from fastapi import FastAPI, Depends, HTTPException, status, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from datetime import date, datetime
-from typing import List, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
 import logging
+import math
 import os
+import time
 from dotenv import load_dotenv
-from backend.observability import get_langfuse, start_trace, end_span, langfuse_diagnostics
+from backend.observability import (
+    begin_span_batch,
+    end_span,
+    flush_span_batch,
+    get_langfuse,
+    langfuse_diagnostics,
+    shutdown_observability,
+    start_trace,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -16,15 +29,26 @@ logging.basicConfig(
 )
 
 # Import our modules
-from backend.database import get_db, create_tables, Problem, Submission, DailyPlan
+from backend.database import (
+    get_db,
+    create_tables,
+    insert_submissions,
+    upsert_problems,
+    Problem,
+    Submission,
+    DailyPlan,
+)
 from backend.leetcode import LeetCodeClient
 from backend.analytics import (
     calculate_overall_stats,
     calculate_topic_stats,
     get_topic_stats_by_name,
+    refresh_topic_stats_cache,
+    invalidate_stats_cache,
     get_recent_submissions_by_topics,
 )
-from backend.claude import ClaudeClient
+from backend.claude import ClaudeClient, clear_response_cache, get_claude, tokens_used_today, usage_user
+from backend.plan_prewarm import prewarm_loop, prewarm_minutes
 from backend.schemas import (
     Problem as ProblemSchema,
     ProblemCreate,
@@ -39,7 +63,10 @@ from backend.schemas import (
     OverallStats,
     TopicStats,
 )
-from backend.schemas import TopicsDecision, TopicsPreviewResponse, ConfirmPlanRequest
+from backend.schemas import TopicsDecision, TopicsPreviewResponse, ConfirmPlanRequest, pin_request_time
+
+# The ASGI app is the module's only public export (uvicorn backend.main:app)
+__all__ = ["app"]
 
 # Load environment variables
 load_dotenv()
@@ -50,9 +77,42 @@ app = FastAPI(
     description="AI-powered LeetCode study planning and progress tracking",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
+class RequestClockMiddleware:
+    """Pin one UTC timestamp per HTTP request for response models (plain ASGI, no extra task)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            pin_request_time()
+        await self.app(scope, receive, send)
+
+
+class SpanBatchMiddleware:
+    """Collect a request's Langfuse span completions and export them once the response is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        begin_span_batch()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            flush_span_batch()
+
+
+app.add_middleware(RequestClockMiddleware)
+app.add_middleware(SpanBatchMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -65,8 +125,9 @@ app.add_middleware(
         "http://127.0.0.1:5174",
     ],  # React dev server + Vite
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # Browsers cache preflights for a day
 )
 
 
@@ -75,17 +136,24 @@ async def preview_daily_plan_topics(
     request: Request,
     time_minutes: int = Query(..., ge=15, le=480),
     custom_instructions: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    claude: ClaudeClient = Depends(get_claude),
 ):
-    """Run Prompt 1 only and return topics + a preview list of recent problems. Does not cache."""
-    topic_stats = calculate_topic_stats(db)
+    """Run Prompt 1 only and return topics + a preview list of recent problems.
+
+    Decisions are reused for 5 minutes per (stats, time, instructions).
+    """
+    _enforce_token_budget(request)
+    # Analytics is sync SQLAlchemy code; run_sync drives it on the async connection
+    topic_stats = await db.run_sync(calculate_topic_stats)
     trace = start_trace(
         "http.preview_daily_plan_topics",
         user_id=str(request.client.host) if request and request.client else None,
-        metadata={"path": str(request.url.path)}
+        metadata={"path": str(request.url.path)},
+        path=request.url.path,
     )
-    claude = ClaudeClient()
-    decision = claude.generate_topics_decision(topic_stats, time_minutes, custom_instructions)
+    # The Claude calls block on HTTP; run them on a worker thread so the event loop keeps serving
+    decision = await asyncio.to_thread(claude.generate_topics_decision, topic_stats, time_minutes, custom_instructions)
     try:
         TopicsDecision(**decision)
     except Exception:
@@ -100,17 +168,38 @@ async def preview_daily_plan_topics(
     return decision
 
 
+def _plan_response(record: DailyPlan, is_cached: bool) -> ORJSONResponse:
+    """Serialize a stored plan with orjson directly; the nested recommendations are
+    plain JSONB data, so FastAPI's jsonable_encoder walk adds nothing."""
+    return ORJSONResponse(content={
+        "id": record.id,
+        "plan_date": record.plan_date,
+        "available_time_minutes": record.available_time_minutes,
+        "focus_topic": record.focus_topic,
+        "recommendations": record.problem_recommendations,
+        "ai_rationale": record.ai_rationale,
+        "created_at": record.created_at,
+        "is_cached": is_cached,
+    })
+
+
 @app.post("/api/daily-plan/confirm")
-async def confirm_daily_plan(body: ConfirmPlanRequest, db: Session = Depends(get_db)):
+async def confirm_daily_plan(
+    request: Request,
+    body: ConfirmPlanRequest,
+    db: AsyncSession = Depends(get_db),
+    claude: ClaudeClient = Depends(get_claude),
+):
     """After user approves topics, run Prompt 2, save and return plan."""
+    _enforce_token_budget(request)
     plan_date = body.date or datetime.now().date()
 
     topics = [body.decision.new_topic] + (body.decision.review_topics or [])
-    recent = get_recent_submissions_by_topics(db, topics, days=30)
+    recent = await db.run_sync(get_recent_submissions_by_topics, topics, days=30)
 
-    claude = ClaudeClient()
-    plan = claude.generate_daily_plan_from_problems(
-        body.decision.dict(), recent, body.time_minutes, body.custom_instructions
+    plan = await asyncio.to_thread(
+        claude.generate_daily_plan_from_problems,
+        body.decision.model_dump(), recent, body.time_minutes, body.custom_instructions,
     )
 
     focus_topic = plan.get("focus_topic") or body.decision.new_topic
@@ -126,19 +215,10 @@ async def confirm_daily_plan(body: ConfirmPlanRequest, db: Session = Depends(get
         ai_rationale=ai_rationale,
     )
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
 
-    return {
-        "id": record.id,
-        "plan_date": record.plan_date,
-        "available_time_minutes": record.available_time_minutes,
-        "focus_topic": record.focus_topic,
-        "recommendations": record.problem_recommendations,
-        "ai_rationale": record.ai_rationale,
-        "created_at": record.created_at,
-        "is_cached": False,
-    }
+    return _plan_response(record, is_cached=False)
 
 # Startup event - create database tables
 @app.on_event("startup")
@@ -158,15 +238,25 @@ async def startup_event():
             print("ℹ️ Langfuse not configured; skipping")
     except Exception:
         print("⚠️ Failed to initialize Langfuse")
+    # Nightly batch generation of tomorrow's plans, when configured
+    app.state.prewarm_task = asyncio.create_task(prewarm_loop()) if prewarm_minutes() else None
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and export any queued spans before the process exits"""
+    if app.state.prewarm_task is not None:
+        app.state.prewarm_task.cancel()
+    shutdown_observability()
 
 
 # Health check endpoint
 @app.get("/health", response_model=HealthCheck)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     """Health check endpoint to verify service and database status"""
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
         database_connected = True
     except Exception:
         database_connected = False
@@ -191,103 +281,85 @@ async def root():
 
 # API Endpoints as specified in project plan
 @app.get("/api/problems", response_model=List[ProblemSchema])
-async def get_problems(db: Session = Depends(get_db)):
-    """List all problems (for reference)"""
-    problems = db.query(Problem).all()
-    return problems
+async def get_problems(
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """List problems (for reference) by leetcode_number; all of them unless limit/offset page the list"""
+    # Plain rows straight to orjson: no ORM objects and no response_model re-validation
+    rows = (
+        await db.execute(
+            select(
+                Problem.id,
+                Problem.leetcode_number,
+                Problem.title,
+                Problem.difficulty,
+                Problem.topics,
+                Problem.leetcode_url,
+            )
+            .order_by(Problem.leetcode_number)
+            .limit(limit)
+            .offset(offset)
+        )
+    ).mappings().all()
+    return ORJSONResponse(content=[dict(row) for row in rows])
 
 
 @app.post("/api/sync", response_model=SyncResponse)
 async def sync_leetcode_data(
+    request: Request,
     limit: int = Query(20, ge=1, le=50),
     dry_run: bool = Query(False),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Fetch latest from LeetCode, upsert problems and insert new submissions.
 
-    - Rate limited to once every 60 seconds (naive, in-memory)
+    - Rate limited per client to once every 60 seconds (token bucket, in-process)
     - Supports dry-run mode to preview counts without writing
     """
-    # In-memory naive rate limiter
-    global _LAST_SYNC_AT  # type: ignore
-    try:
-        MIN_SYNC_SECONDS = 60
-        now = datetime.now()
-        if '_LAST_SYNC_AT' in globals() and _LAST_SYNC_AT is not None:
-            delta = (now - _LAST_SYNC_AT).total_seconds()
-            if delta < MIN_SYNC_SECONDS:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Sync allowed once every {MIN_SYNC_SECONDS}s. Try again in {int(MIN_SYNC_SECONDS - delta)}s."
-                )
-    except Exception:
-        # If any issue with rate limiter state, proceed without blocking
-        pass
-
-    client = LeetCodeClient()
-    try:
-        fetched = await client.fetch_recent_submissions(limit=limit)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"LeetCode fetch failed: {e}")
-
-    if not fetched:
-        # Could be missing username/session; still return a valid response
-        return SyncResponse(new_problems=0, new_submissions=0, message="No new submissions since last sync.")
+    # Dry runs only check the bucket; real syncs take the token before any await
+    _take_sync_token(request.client.host if request.client else "unknown", consume=not dry_run)
 
+    fetched_count = 0
     new_problems_count = 0
     new_submissions_count = 0
+    # Problems counted as new in earlier chunks (dry runs never write them)
+    seen_new_problems: Set[int] = set()
 
-    # Map existing problems by leetcode_number for quick lookup
-    existing_problems = {
-        p.leetcode_number: p for p in db.query(Problem).all()
-    }
-
-    # Prepare write operations
-    for item in fetched:
-        leetcode_number = int(item["leetcode_number"]) if isinstance(item["leetcode_number"], str) else item["leetcode_number"]
-        problem = existing_problems.get(leetcode_number)
-
-        if problem is None:
-            # Upsert new Problem
-            problem = Problem(
-                leetcode_number=leetcode_number,
-                title=item.get("title", ""),
-                difficulty=item.get("difficulty", "medium"),
-                topics=item.get("topics", []) or ["Unknown"],
-                leetcode_url=item.get("leetcode_url", "")
-            )
-            if not dry_run:
-                db.add(problem)
-                db.flush()  # get id
-            new_problems_count += 1
-            existing_problems[leetcode_number] = problem
-
-        # Insert Submission if not exists for (problem_id, solved_date)
-        solved_date = item.get("solved_date")
-        if not dry_run:
-            existing_submission = (
-                db.query(Submission)
-                .filter(Submission.problem_id == problem.id)
-                .filter(Submission.solved_date == solved_date)
-                .first()
-            )
-        else:
-            existing_submission = None
-
-        if existing_submission is None:
-            new_submissions_count += 1
-            if not dry_run:
-                sub = Submission(
-                    problem_id=problem.id,
-                    solved_date=solved_date,
-                    attempts=1,
-                )
-                db.add(sub)
+    # Process submissions in chunks as their metadata arrives, so DB work overlaps
+    # the remaining LeetCode requests and only one chunk is held at a time
+    async with LeetCodeClient() as client:
+        submissions = client.iter_recent_submissions(limit=limit)
+        try:
+            while True:
+                try:
+                    chunk = await _next_chunk(submissions, SYNC_CHUNK_SIZE)
+                except Exception as e:
+                    raise HTTPException(status_code=502, detail=f"LeetCode fetch failed: {e}")
+                if not chunk:
+                    break
+                fetched_count += len(chunk)
+                problems_added, submissions_added = await _sync_chunk(db, chunk, dry_run, seen_new_problems)
+                new_problems_count += problems_added
+                new_submissions_count += submissions_added
+        finally:
+            # Cancels any metadata requests still in flight if we stop early
+            await submissions.aclose()
+
+    if not fetched_count:
+        # Could be missing username/session; still return a valid response
+        return SyncResponse(new_problems=0, new_submissions=0, message="No new submissions since last sync.")
 
     if not dry_run:
-        db.commit()
-        # Mark sync time
-        _set_last_sync()
+        await db.commit()
+        if new_submissions_count:
+            # Keep the stored topic stats in step with the new history
+            invalidate_stats_cache()
+            await db.run_sync(refresh_topic_stats_cache)
+            await db.commit()
+            # Cached plans were generated from the old history
+            clear_response_cache()
 
     message = (
         f"dry-run: {dry_run}. Added problems: {new_problems_count}, submissions: {new_submissions_count}."
@@ -301,72 +373,213 @@ async def sync_leetcode_data(
     )
 
 
-def _set_last_sync():
-    global _LAST_SYNC_AT  # type: ignore
-    _LAST_SYNC_AT = datetime.now()
+SYNC_CHUNK_SIZE = 25
+
+
+async def _next_chunk(items: AsyncIterator[Dict], size: int) -> List[Dict]:
+    """Pull up to size items from an async iterator; empty once it is exhausted."""
+    chunk: List[Dict] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+async def _sync_chunk(db: AsyncSession, chunk: List[Dict], dry_run: bool, seen_new_problems: Set[int]) -> Tuple[int, int]:
+    """Upsert one chunk of fetched submissions; returns (new problems, new submissions)."""
+    chunk_numbers = {int(item["leetcode_number"]) for item in chunk}
+
+    # Existing problem ids and (leetcode_number, solved_date) pairs for this chunk, one query each
+    problem_ids = dict(
+        (
+            await db.execute(
+                select(Problem.leetcode_number, Problem.id)
+                .where(Problem.leetcode_number.in_(chunk_numbers))
+            )
+        ).all()
+    )
+    existing_pairs = set(
+        (
+            await db.execute(
+                select(Problem.leetcode_number, Submission.solved_date)
+                .join(Problem, Submission.problem_id == Problem.id)
+                .where(Problem.leetcode_number.in_(chunk_numbers))
+            )
+        ).all()
+    )
+
+    new_problems = {}
+    new_submissions = []
+    for item in chunk:
+        leetcode_number = int(item["leetcode_number"]) if isinstance(item["leetcode_number"], str) else item["leetcode_number"]
+
+        if leetcode_number not in problem_ids and leetcode_number not in seen_new_problems:
+            seen_new_problems.add(leetcode_number)
+            new_problems[leetcode_number] = {
+                "leetcode_number": leetcode_number,
+                "title": item.get("title", ""),
+                "difficulty": item.get("difficulty", "medium"),
+                "topics": item.get("topics", []) or ["Unknown"],
+                "leetcode_url": item.get("leetcode_url", ""),
+            }
+
+        # Insert Submission if not exists for (problem, solved_date)
+        solved_date = item.get("solved_date")
+        if (leetcode_number, solved_date) not in existing_pairs:
+            existing_pairs.add((leetcode_number, solved_date))
+            new_submissions.append({"leetcode_number": leetcode_number, "solved_date": solved_date, "attempts": 1})
+
+    if not dry_run and (new_problems or new_submissions):
+        def _write(session):
+            # One multi-row upsert (RETURNING ids) and one multi-row submission insert
+            connection = session.connection()
+            problem_ids.update(upsert_problems(connection, new_problems))
+            insert_submissions(connection, new_submissions, problem_ids)
+
+        await db.run_sync(_write)
+    return len(new_problems), len(new_submissions)
+
+
+# Per-client token buckets for /api/sync: client -> (tokens, updated_at).
+# One token, refilled over SYNC_INTERVAL_SECONDS, i.e. one sync per minute.
+SYNC_INTERVAL_SECONDS = 60
+_SYNC_BUCKET_CAPACITY = 1.0
+_sync_buckets: Dict[str, Tuple[float, float]] = {}
+# Sweep refilled buckets once this many clients are tracked; a full bucket is
+# the same as no entry, so only clients seen in the last interval are kept
+_SYNC_BUCKET_SWEEP_AT = 256
+
+
+def _sweep_sync_buckets(now: float) -> None:
+    full = [
+        key for key, (tokens, updated_at) in _sync_buckets.items()
+        if tokens + (now - updated_at) / SYNC_INTERVAL_SECONDS >= _SYNC_BUCKET_CAPACITY
+    ]
+    for key in full:
+        del _sync_buckets[key]
+
+
+def _take_sync_token(client_key: str, consume: bool = True) -> None:
+    """Raise 429 with Retry-After if the client has no token; otherwise optionally consume it."""
+    now = time.monotonic()
+    tokens, updated_at = _sync_buckets.get(client_key, (_SYNC_BUCKET_CAPACITY, now))
+    tokens = min(_SYNC_BUCKET_CAPACITY, tokens + (now - updated_at) / SYNC_INTERVAL_SECONDS)
+    if tokens < 1:
+        retry_after = math.ceil((1 - tokens) * SYNC_INTERVAL_SECONDS)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Sync allowed once every {SYNC_INTERVAL_SECONDS}s. Try again in {retry_after}s.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    if consume:
+        _sync_buckets[client_key] = (tokens - 1, now)
+    elif tokens >= _SYNC_BUCKET_CAPACITY:
+        # Dry run on a full bucket: nothing worth remembering
+        _sync_buckets.pop(client_key, None)
+    else:
+        _sync_buckets[client_key] = (tokens, now)
+    if len(_sync_buckets) > _SYNC_BUCKET_SWEEP_AT:
+        _sweep_sync_buckets(now)
+
+
+# Daily Claude token budget per client; 0 disables the check
+DAILY_TOKEN_BUDGET = int(os.getenv("DAILY_TOKEN_BUDGET", "200000"))
+
+
+def _usage_key(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _seconds_until_midnight() -> int:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def _enforce_token_budget(request: Request) -> None:
+    """503 with Retry-After once the client has spent today's budget; otherwise charge its Claude calls to it."""
+    user = _usage_key(request)
+    if DAILY_TOKEN_BUDGET and tokens_used_today(user) >= DAILY_TOKEN_BUDGET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Daily AI token budget exhausted. Try again tomorrow.",
+            headers={"Retry-After": str(_seconds_until_midnight())},
+        )
+    usage_user.set(user)
+
+
+@app.get("/api/usage")
+async def get_token_usage(request: Request):
+    """Claude tokens spent today by this client, against the daily budget."""
+    user = _usage_key(request)
+    return {
+        "date": datetime.now().date(),
+        "tokens_used": tokens_used_today(user),
+        "daily_budget": DAILY_TOKEN_BUDGET or None,
+    }
 
 
 @app.get("/api/stats", response_model=OverallStats)
-async def get_overall_stats_endpoint(db: Session = Depends(get_db)):
+async def get_overall_stats_endpoint(db: AsyncSession = Depends(get_db)):
     """Overall statistics calculated on-demand."""
-    return calculate_overall_stats(db)
+    # Analytics already emits the schema's shape; skip response_model re-validation
+    return ORJSONResponse(content=await db.run_sync(calculate_overall_stats))
 
 
 @app.get("/api/stats/topics", response_model=List[TopicStats])
-async def get_topic_stats_endpoint(db: Session = Depends(get_db)):
+async def get_topic_stats_endpoint(db: AsyncSession = Depends(get_db)):
     """All topic breakdowns with weighted scores and time windows."""
-    return calculate_topic_stats(db)
+    return ORJSONResponse(content=await db.run_sync(calculate_topic_stats))
 
 
 @app.get("/api/stats/topics/{topic}", response_model=TopicStats)
-async def get_specific_topic_stats(topic: str, db: Session = Depends(get_db)):
+async def get_specific_topic_stats(topic: str, db: AsyncSession = Depends(get_db)):
     """Specific topic details by name."""
-    stats = get_topic_stats_by_name(db, topic)
+    stats = await db.run_sync(get_topic_stats_by_name, topic)
     if not stats:
         raise HTTPException(status_code=404, detail=f"Topic '{topic}' not found")
-    return stats
+    return ORJSONResponse(content=stats)
 
 
 @app.get("/api/daily-plan")
 async def get_daily_plan(
+    request: Request,
     date: Optional[date] = None,
     time_minutes: Optional[int] = None,
     custom_instructions: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get plan for date (or generate if doesn't exist)."""
     plan_date = date or datetime.now().date()
 
     # If exists: return cached plan (check all parameters)
     existing = (
-        db.query(DailyPlan)
-        .filter(
-            DailyPlan.plan_date == plan_date,
-            DailyPlan.available_time_minutes == time_minutes,
-            DailyPlan.custom_instructions == custom_instructions
+        await db.execute(
+            select(DailyPlan)
+            .where(
+                DailyPlan.plan_date == plan_date,
+                DailyPlan.available_time_minutes == time_minutes,
+                DailyPlan.custom_instructions == custom_instructions
+            )
+            .limit(1)
         )
-        .first()
-    )
+    ).scalars().first()
     if existing:
-        return {
-            "id": existing.id,
-            "plan_date": existing.plan_date,
-            "available_time_minutes": existing.available_time_minutes,
-            "focus_topic": existing.focus_topic,
-            "recommendations": existing.problem_recommendations,
-            "ai_rationale": existing.ai_rationale,
-            "created_at": existing.created_at,
-            "is_cached": True,
-        }
+        return _plan_response(existing, is_cached=True)
 
     if time_minutes is None:
         raise HTTPException(status_code=400, detail="time_minutes is required when generating a new plan")
 
+    _enforce_token_budget(request)
+
     # Generate a new plan using two-step flow (Phase 7)
-    topic_stats = calculate_topic_stats(db)
+    topic_stats = await db.run_sync(calculate_topic_stats)
     try:
-        claude = ClaudeClient()
-        decision = claude.generate_topics_decision(topic_stats, time_minutes, custom_instructions)
+        claude = get_claude()
+        decision = await asyncio.to_thread(
+            claude.generate_topics_decision, topic_stats, time_minutes, custom_instructions
+        )
         # Validate decision or fallback
         try:
             TopicsDecision(**decision)
@@ -377,8 +590,10 @@ async def get_daily_plan(
             decision = {"new_topic": new_topic, "review_topics": review_topics}
 
         topics = [decision.get("new_topic")] + (decision.get("review_topics") or [])
-        recent = get_recent_submissions_by_topics(db, topics, days=30)
-        plan = claude.generate_daily_plan_from_problems(decision, recent, time_minutes, custom_instructions)
+        recent = await db.run_sync(get_recent_submissions_by_topics, topics, days=30)
+        plan = await asyncio.to_thread(
+            claude.generate_daily_plan_from_problems, decision, recent, time_minutes, custom_instructions
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate plan: {e}")
 
@@ -398,19 +613,10 @@ async def get_daily_plan(
         ai_rationale=ai_rationale,
     )
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
 
-    return {
-        "id": record.id,
-        "plan_date": record.plan_date,
-        "available_time_minutes": record.available_time_minutes,
-        "focus_topic": record.focus_topic,
-        "recommendations": record.problem_recommendations,
-        "ai_rationale": record.ai_rationale,
-        "created_at": record.created_at,
-        "is_cached": False,
-    }
+    return _plan_response(record, is_cached=False)
 
 
 # Error handlers
@@ -422,6 +628,16 @@ async def not_found_handler(request, exc):
     )
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request, exc):
+    """Connection pool exhausted: shed load instead of letting requests pile up"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=ErrorResponse(error="Service Unavailable", detail="Database is busy, please retry").model_dump(mode="json"),
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     return ErrorResponse(
@@ -432,7 +648,7 @@ async def internal_error_handler(request, exc):
 
 @app.get("/observability/test")
 async def observability_test():
-    trace = start_trace("http.observability_test", metadata={"note": "manual test"})
+    trace = start_trace("http.observability_test", metadata={"note": "manual test"}, always=True)
     end_span(trace, output={"ok": True})
     return {"ok": True}
 
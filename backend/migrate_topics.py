@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+One-shot migration that backfills the normalized topics/problem_topics tables
+from the existing Problem.topics arrays. Safe to re-run.
+"""
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from database import clear_topic_stats_cache, create_tables, engine
+
+load_dotenv()
+
+def migrate_topics():
+    """Populate topics and problem_topics from problems.topics"""
+
+    # Make sure the new tables exist
+    create_tables()
+
+    with engine.begin() as conn:
+        try:
+            topics_result = conn.execute(text("""
+                INSERT INTO topics (name)
+                SELECT DISTINCT btrim(raw)
+                FROM problems, unnest(problems.topics) AS raw
+                WHERE btrim(raw) <> ''
+                ON CONFLICT (name) DO NOTHING
+            """))
+
+            links_result = conn.execute(text("""
+                INSERT INTO problem_topics (problem_id, topic_id)
+                SELECT DISTINCT problems.id, topics.id
+                FROM problems
+                CROSS JOIN LATERAL unnest(problems.topics) AS raw
+                JOIN topics ON topics.name = btrim(raw)
+                ON CONFLICT DO NOTHING
+            """))
+            clear_topic_stats_cache(conn)
+
+            print(f"✅ Successfully migrated:")
+            print(f"   🏷️  {topics_result.rowcount} new topics")
+            print(f"   🔗 {links_result.rowcount} new problem/topic links")
+
+        except Exception as e:
+            print(f"❌ Error migrating topics: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_topics()
@@ -1,55 +1,249 @@
+import importlib.util
 import os
-from typing import Optional, Any, Dict
+import random
+import threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Deque, List, Optional, Any, Dict
 
-from dotenv import load_dotenv
+from pydantic import TypeAdapter
 
-# Import Langfuse core separately from optional models to avoid false negatives
-try:
-    from langfuse import Langfuse  # type: ignore
-except Exception:
-    Langfuse = None  # type: ignore
+# Langfuse (and dotenv) are imported on first use, so processes that never
+# trace, or run without Langfuse keys, don't pay for the import
+Langfuse = None  # type: ignore
+LLMUsage = None  # type: ignore
 
-try:
-    from langfuse.model import LLMUsage  # type: ignore
-except Exception:
-    LLMUsage = None  # type: ignore
+
+def _langfuse_installed() -> bool:
+    return importlib.util.find_spec("langfuse") is not None
+
+
+def _import_langfuse() -> None:
+    global Langfuse, LLMUsage
+    # Import Langfuse core separately from optional models to avoid false negatives
+    try:
+        from langfuse import Langfuse  # type: ignore
+    except Exception:
+        Langfuse = None  # type: ignore
+
+    try:
+        from langfuse.model import LLMUsage  # type: ignore
+    except Exception:
+        LLMUsage = None  # type: ignore
 
 
 _langfuse_client: Optional[Any] = None
+# Set once init has run, whether or not it produced a client
+_langfuse_initialized = False
+# True once init has produced a client; checked first by the span helpers so the
+# disabled case is a single branch
+_LANGFUSE_ENABLED = False
+_langfuse_lock = threading.Lock()
 
+# Langfuse settings, read from the environment (and .env) once per process
+_ENV_LOADED = False
+_ENV: Dict[str, Optional[str]] = {}
 
-def get_langfuse() -> Optional[Any]:
-    global _langfuse_client
+
+def _ensure_env() -> Dict[str, Optional[str]]:
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _ENV.update(
+            public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
+            secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
+            host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com"),
+        )
+        _ENV_LOADED = True
+    return _ENV
+
+
+# Converts span outputs (models, dates, nested dicts) to JSON-native values in
+# pydantic-core, so Langfuse's own serializer only sees plain data
+_OUTPUT_ADAPTER = TypeAdapter(Any)
+
+
+def _jsonable_output(output: Any) -> Any:
+    try:
+        return _OUTPUT_ADAPTER.dump_python(output, mode="json")
+    except Exception:
+        return output
+
+
+# Span levels accepted by Langfuse
+_VALID_LEVELS = frozenset(("DEFAULT", "DEBUG", "INFO", "WARNING", "ERROR"))
+
+# Liveness/monitoring routes are never traced
+_UNTRACED_PATHS = frozenset({"/health", "/", "/observability/diagnostics"})
+
+
+_DEFAULT_TRACE_SAMPLE = 0.1
+
+
+def _trace_sample_rate() -> float:
+    """Head-sampling rate for traces, from TRACE_SAMPLE (default 0.1, also used when unparseable)."""
+    try:
+        return float(os.getenv("TRACE_SAMPLE", _DEFAULT_TRACE_SAMPLE))
+    except ValueError:
+        return _DEFAULT_TRACE_SAMPLE
+
+
+# Span completions are handed to a background thread so request handlers never
+# wait on Langfuse. Bounded, dropping the oldest entries when full.
+_EXPORT_QUEUE_SIZE = 10_000
+_export_queue: Deque[Callable[[], None]] = deque(maxlen=_EXPORT_QUEUE_SIZE)
+_export_ready = threading.Event()
+_export_thread: Optional[threading.Thread] = None
+_export_lock = threading.Lock()
+
+
+def _sync_export() -> bool:
+    """LANGFUSE_SYNC_EXPORT=1 ends spans inline (useful in tests)."""
+    return os.getenv("LANGFUSE_SYNC_EXPORT", "").lower() in {"1", "true", "yes"}
+
+
+def _run_pending_exports() -> None:
+    while True:
+        try:
+            export = _export_queue.popleft()
+        except IndexError:
+            return
+        try:
+            export()
+        except Exception:
+            pass
+
+
+def _drain_exports() -> None:
+    while True:
+        _export_ready.wait(timeout=5.0)
+        _export_ready.clear()
+        _run_pending_exports()
+
+
+def _submit_export(export: Callable[[], None]) -> None:
+    global _export_thread
+    if _sync_export():
+        try:
+            export()
+        except Exception:
+            pass
+        return
+    if _export_thread is None:
+        with _export_lock:
+            if _export_thread is None:
+                _export_thread = threading.Thread(target=_drain_exports, name="langfuse-export", daemon=True)
+                _export_thread.start()
+    _export_queue.append(export)
+    _export_ready.set()
+
+
+# Span completions for the current request; end_span appends here while a batch
+# is open so the whole request is handed to the export worker as one job. Each
+# entry already carries the end_time stamped by end_span, so deferring the
+# export does not move span timings to the end of the request.
+_span_batch: ContextVar[Optional[List[Callable[[], None]]]] = ContextVar("langfuse_span_batch", default=None)
+
+
+def begin_span_batch() -> None:
+    """Buffer end_span exports (timestamped at call time) for the current context until flush_span_batch."""
+    if _LANGFUSE_ENABLED:
+        _span_batch.set([])
+
+
+def flush_span_batch() -> None:
+    """Submit the buffered span completions as a single export job."""
+    batch = _span_batch.get()
+    if batch is None:
+        return
+    _span_batch.set(None)
+    if not batch:
+        return
+
+    def export() -> None:
+        for end in batch:
+            try:
+                end()
+            except Exception:
+                pass
+
+    _submit_export(export)
+
+
+def shutdown_observability() -> None:
+    """Run any queued span completions and flush the Langfuse client."""
+    _run_pending_exports()
     if _langfuse_client is not None:
+        try:
+            _langfuse_client.flush()
+        except Exception:
+            pass
+
+
+def get_langfuse() -> Optional[Any]:
+    global _langfuse_client, _langfuse_initialized, _LANGFUSE_ENABLED
+    # Lock-free once initialized; only the first concurrent callers contend
+    if _langfuse_initialized:
         return _langfuse_client
+    with _langfuse_lock:
+        if not _langfuse_initialized:
+            _langfuse_client = _init_langfuse()
+            _LANGFUSE_ENABLED = _langfuse_client is not None
+            _langfuse_initialized = True
+    return _langfuse_client
 
-    load_dotenv()
-    public_key = os.getenv("LANGFUSE_PUBLIC_KEY")
-    secret_key = os.getenv("LANGFUSE_SECRET_KEY")
-    host = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
 
+def _init_langfuse() -> Optional[Any]:
+    env = _ensure_env()
+    public_key = env["public_key"]
+    secret_key = env["secret_key"]
+    host = env["host"]
+
+    if public_key and secret_key:
+        _import_langfuse()
     if not (public_key and secret_key and Langfuse):
         try:
             print(
                 "[Langfuse] Skipping init: package_installed=%s, has_public=%s, has_secret=%s, host=%s"
-                % (bool(Langfuse), bool(public_key), bool(secret_key), host)
+                % (_langfuse_installed(), bool(public_key), bool(secret_key), host)
             )
         except Exception:
             pass
         return None
 
     try:
-        _langfuse_client = Langfuse(public_key=public_key, secret_key=secret_key, host=host)
+        # Export in batches of up to 100 events, at least every 5s
+        return Langfuse(
+            public_key=public_key, secret_key=secret_key, host=host, flush_at=100, flush_interval=5
+        )
     except Exception as e:
         try:
             print(f"[Langfuse] Init failed: {e}")
         except Exception:
             pass
-        _langfuse_client = None
-    return _langfuse_client
+        return None
+
 
+def start_trace(
+    name: str,
+    user_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    path: Optional[str] = None,
+    always: bool = False,
+) -> Optional[Any]:
+    """Start a trace, or return None when untraced/sampled out (spans and end_span accept None).
 
-def start_trace(name: str, user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+    ``always`` skips sampling, e.g. for the manual test endpoint.
+    """
+    if _langfuse_initialized and not _LANGFUSE_ENABLED:
+        return None
+    if path in _UNTRACED_PATHS:
+        return None
+    if not always and random.random() >= _trace_sample_rate():
+        return None
     client = get_langfuse()
     if client is None:
         return None
@@ -60,7 +254,7 @@ def start_trace(name: str, user_id: Optional[str] = None, metadata: Optional[Dic
 
 
 def start_span(parent: Optional[Any], name: str, input: Optional[Any] = None, metadata: Optional[Dict[str, Any]] = None) -> Optional[Any]:
-    if parent is None:
+    if not _LANGFUSE_ENABLED or parent is None:
         return None
     try:
         return parent.span(name=name, input=input, metadata=metadata or {})
@@ -69,12 +263,11 @@ def start_span(parent: Optional[Any], name: str, input: Optional[Any] = None, me
 
 
 def end_span(span: Optional[Any], output: Optional[Any] = None, usage: Optional[Dict[str, Any]] = None, status_message: Optional[str] = None, level: str = "DEFAULT") -> None:
-    if span is None:
+    if not _LANGFUSE_ENABLED or span is None:
         return
     try:
-        kwargs: Dict[str, Any] = {}
-        if output is not None:
-            kwargs["output"] = output
+        # Stamp the end now; span.end() runs later on the export worker
+        kwargs: Dict[str, Any] = {"end_time": datetime.now(timezone.utc)}
         if usage and LLMUsage is not None:
             try:
                 kwargs["usage"] = LLMUsage(**usage)
@@ -83,19 +276,32 @@ def end_span(span: Optional[Any], output: Optional[Any] = None, usage: Optional[
         if status_message:
             kwargs["status_message"] = status_message
         # Only set level if it's a valid enum value
-        valid_levels = {"DEFAULT", "DEBUG", "INFO", "WARNING", "ERROR"}
-        if level and level in valid_levels:
+        if level and level in _VALID_LEVELS:
             kwargs["level"] = level
-        span.end(**kwargs)
+
+        def export() -> None:
+            # Output conversion happens on the export worker, off the request path
+            if output is not None:
+                kwargs["output"] = _jsonable_output(output)
+            span.end(**kwargs)
+
+        batch = _span_batch.get()
+        if batch is not None:
+            batch.append(export)
+        else:
+            _submit_export(export)
     except Exception:
         pass
 
 
 def observe_llm_call(trace: Optional[Any], name: str, model: str, input_text: str, call: callable) -> Dict[str, Any]:
+    if not _LANGFUSE_ENABLED:
+        return {"result": call(), "error": None}
     span = start_span(trace, name=name, input={"model": model, "input": input_text})
     try:
         result = call()
-        # result should include text and possibly token counts; we pass through raw
+        # result should include text and possibly token counts; end_span converts it
+        # to JSON-native data on the export worker
         end_span(span, output=result)
         return {"result": result, "error": None}
     except Exception as e:
@@ -103,16 +309,20 @@ def observe_llm_call(trace: Optional[Any], name: str, model: str, input_text: st
         raise
 
 
+# Neither the environment nor the installed packages change mid-process
+_DIAGNOSTICS: Optional[Dict[str, Any]] = None
+
+
 def langfuse_diagnostics() -> Dict[str, Any]:
-    load_dotenv()
-    public_key = os.getenv("LANGFUSE_PUBLIC_KEY")
-    secret_key = os.getenv("LANGFUSE_SECRET_KEY")
-    host = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-    return {
-        "package_installed": bool(Langfuse),
-        "has_public_key": bool(public_key),
-        "has_secret_key": bool(secret_key),
-        "host": host,
-    }
+    global _DIAGNOSTICS
+    if _DIAGNOSTICS is None:
+        env = _ensure_env()
+        _DIAGNOSTICS = {
+            "package_installed": _langfuse_installed(),
+            "has_public_key": bool(env["public_key"]),
+            "has_secret_key": bool(env["secret_key"]),
+            "host": env["host"],
+        }
+    return dict(_DIAGNOSTICS)
 
 
@@ -0,0 +1,149 @@
+"""
+Nightly pre-generation of tomorrow's daily plans through the Message Batches API.
+
+Enabled by PLAN_PREWARM_MINUTES (comma-separated time budgets, e.g. "60,90").
+Plans are stored with no custom instructions, so the matching GET /api/daily-plan
+request the next morning is served from the DailyPlan table. Every worker runs
+the loop, but a Postgres advisory lock lets only one of them submit each night.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import func, select
+
+from backend.analytics import calculate_topic_stats, get_recent_submissions_by_topics
+from backend.claude import get_claude
+from backend.database import AsyncSessionLocal, DailyPlan, async_engine
+
+logger = logging.getLogger(__name__)
+
+PREWARM_HOUR = int(os.getenv("PLAN_PREWARM_HOUR", "23"))
+POLL_SECONDS = 300
+# Batches expire after 24 hours; stop polling one that never finishes
+BATCH_DEADLINE_SECONDS = 24 * 60 * 60
+# Session-level advisory lock key held by the worker running tonight's prewarm
+PREWARM_LOCK_KEY = 0x6C65_6574  # "leet"
+
+
+def prewarm_minutes() -> List[int]:
+    """Time budgets to pre-generate plans for; empty when pre-warming is disabled."""
+    raw = os.getenv("PLAN_PREWARM_MINUTES", "")
+    return sorted({int(part) for part in raw.split(",") if part.strip().isdigit()})
+
+
+def _seconds_until(hour: int) -> float:
+    now = datetime.now()
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+async def _stored_minutes(db, plan_date: date) -> Set[int]:
+    """Time budgets that already have an uncustomized plan for plan_date."""
+    result = await db.execute(
+        select(DailyPlan.available_time_minutes).where(
+            DailyPlan.plan_date == plan_date,
+            DailyPlan.custom_instructions.is_(None),
+        )
+    )
+    return set(result.scalars())
+
+
+async def prewarm_plans(plan_date: date) -> int:
+    """Batch-generate plans for plan_date; returns how many were stored."""
+    minutes = prewarm_minutes()
+    if not minutes:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    claude = get_claude()
+
+    async with AsyncSessionLocal() as db:
+        existing = await _stored_minutes(db, plan_date)
+        todo = [m for m in minutes if m not in existing]
+        if not todo:
+            return 0
+
+        # Prompt 1 is a cheap call and Prompt 2 depends on it, so only Prompt 2 is batched
+        topic_stats = await db.run_sync(calculate_topic_stats)
+        pending: Dict[str, Tuple[int, Dict]] = {}
+        batch_requests = []
+        for time_minutes in todo:
+            decision = await loop.run_in_executor(
+                None, claude.generate_topics_decision, topic_stats, time_minutes, None
+            )
+            topics = [decision.get("new_topic")] + (decision.get("review_topics") or [])
+            recent = await db.run_sync(get_recent_submissions_by_topics, topics, days=30)
+            custom_id = f"plan-{plan_date.isoformat()}-{time_minutes}"
+            pending[custom_id] = (time_minutes, decision)
+            batch_requests.append(
+                claude.build_daily_plan_request(custom_id, decision, recent, time_minutes, None)
+            )
+
+    batch_id = await loop.run_in_executor(None, claude.submit_batch, batch_requests)
+    logger.info("Submitted plan batch %s for %s (%d plans)", batch_id, plan_date, len(batch_requests))
+
+    deadline = time.monotonic() + BATCH_DEADLINE_SECONDS
+    while True:
+        if time.monotonic() >= deadline:
+            logger.warning("Plan batch %s for %s did not finish within 24h; giving up", batch_id, plan_date)
+            return 0
+        await asyncio.sleep(POLL_SECONDS)
+        results = await loop.run_in_executor(None, claude.batch_results, batch_id)
+        if results is not None:
+            break
+
+    stored = 0
+    async with AsyncSessionLocal() as db:
+        # Users may have generated some of these plans while the batch ran
+        existing = await _stored_minutes(db, plan_date)
+        for custom_id, content_text in results.items():
+            if custom_id not in pending:
+                continue
+            time_minutes, decision = pending[custom_id]
+            if time_minutes in existing:
+                continue
+            plan = claude.finalize_daily_plan(decision, content_text)
+            db.add(DailyPlan(
+                plan_date=plan_date,
+                available_time_minutes=time_minutes,
+                custom_instructions=None,
+                problem_recommendations=plan.get("recommendations") or [],
+                focus_topic=plan.get("focus_topic") or "General Review",
+                ai_rationale=plan.get("rationale") or "",
+            ))
+            existing.add(time_minutes)
+            stored += 1
+        await db.commit()
+    return stored
+
+
+async def prewarm_loop() -> None:
+    """Run prewarm_plans for tomorrow every night at PREWARM_HOUR (local time)."""
+    while True:
+        await asyncio.sleep(_seconds_until(PREWARM_HOUR))
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        try:
+            async with async_engine.connect() as conn:
+                locked = await conn.scalar(select(func.pg_try_advisory_lock(PREWARM_LOCK_KEY)))
+                # The lock is session-level; end the transaction so the connection doesn't sit idle in one
+                await conn.commit()
+                if not locked:
+                    logger.info("Another worker is pre-warming plans for %s", tomorrow)
+                    continue
+                try:
+                    stored = await prewarm_plans(tomorrow)
+                    logger.info("Pre-warmed %d daily plans for %s", stored, tomorrow)
+                finally:
+                    await conn.execute(select(func.pg_advisory_unlock(PREWARM_LOCK_KEY)))
+                    await conn.commit()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Failed to pre-warm daily plans for %s", tomorrow)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, validator
-from datetime import date, datetime
+import re
+from contextvars import ContextVar
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import date, datetime, timezone
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -11,26 +13,64 @@ class DifficultyEnum(str, Enum):
     HARD = "hard"
 
 
+_UTC = timezone.utc
+# Wall-clock time of the current request, pinned by middleware so every
+# response model built during the request shares one clock read
+_request_now: ContextVar[Optional[datetime]] = ContextVar("request_now", default=None)
+
+
+def pin_request_time() -> None:
+    _request_now.set(datetime.now(_UTC))
+
+
+def _now() -> datetime:
+    return _request_now.get() or datetime.now(_UTC)
+
+
+# Response schemas: read from ORM rows, ignore extra attributes, never re-validate on assignment
+_RESPONSE_CONFIG = ConfigDict(from_attributes=True, populate_by_name=True, extra="ignore", validate_assignment=False)
+
+
+# Problem page URLs as built by the sync and import paths (.../problems/<slug>/description/)
+_LEETCODE_URL_RE = re.compile(r"^https?://(?:www\.)?leetcode\.com/problems/[\w-]+(?:/description)?/?$")
+
+
 # Base schemas for database models
 class ProblemBase(BaseModel):
     """Base schema for LeetCode problems"""
     leetcode_number: int = Field(..., description="LeetCode problem number")
     title: str = Field(..., min_length=1, description="Problem title")
     difficulty: DifficultyEnum = Field(..., description="Problem difficulty level")
-    topics: List[str] = Field(..., min_items=1, description="List of topic tags")
+    topics: List[str] = Field(..., min_length=1, description="List of topic tags")
     leetcode_url: str = Field(..., description="URL to the problem on LeetCode")
     
-    @validator('leetcode_number')
+    @field_validator('leetcode_number', mode='after')
+    @classmethod
     def validate_leetcode_number(cls, v):
         if v <= 0:
             raise ValueError('LeetCode number must be positive')
         return v
     
-    @validator('topics')
+    @field_validator('topics', mode='after')
+    @classmethod
     def validate_topics(cls, v):
-        if not v or any(not topic.strip() for topic in v):
+        # Strip and check in one pass
+        stripped = []
+        for topic in v:
+            topic = topic.strip()
+            if not topic:
+                raise ValueError('Topics cannot be empty or contain empty strings')
+            stripped.append(topic)
+        if not stripped:
             raise ValueError('Topics cannot be empty or contain empty strings')
-        return [topic.strip() for topic in v]
+        return stripped
+
+    @field_validator('leetcode_url', mode='after')
+    @classmethod
+    def validate_leetcode_url(cls, v):
+        if not _LEETCODE_URL_RE.match(v):
+            raise ValueError('LeetCode URL must point to a leetcode.com/problems/ page')
+        return v
 
 
 class ProblemCreate(ProblemBase):
@@ -41,9 +81,8 @@ class ProblemCreate(ProblemBase):
 class Problem(ProblemBase):
     """Schema for problem response"""
     id: int
-    
-    class Config:
-        from_attributes = True
+
+    model_config = _RESPONSE_CONFIG
 
 
 class SubmissionBase(BaseModel):
@@ -52,7 +91,8 @@ class SubmissionBase(BaseModel):
     solved_date: date = Field(..., description="Date when problem was solved")
     attempts: int = Field(1, ge=1, description="Number of attempts to solve")
     
-    @validator('solved_date')
+    @field_validator('solved_date', mode='after')
+    @classmethod
     def validate_solved_date(cls, v):
         if v > date.today():
             raise ValueError('Solved date cannot be in the future')
@@ -68,9 +108,8 @@ class Submission(SubmissionBase):
     """Schema for submission response"""
     id: int
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
+
+    model_config = _RESPONSE_CONFIG
 
 
 class SubmissionWithProblem(Submission):
@@ -81,6 +120,8 @@ class SubmissionWithProblem(Submission):
 # Analytics and statistics schemas
 class TopicStats(BaseModel):
     """Schema for topic statistics"""
+    model_config = _RESPONSE_CONFIG
+
     topic: str = Field(..., description="Topic name")
     easy_3d: int = Field(0, ge=0, description="Easy problems solved in last 3 days")
     medium_3d: int = Field(0, ge=0, description="Medium problems solved in last 3 days")
@@ -100,6 +141,8 @@ class TopicStats(BaseModel):
 
 class OverallStats(BaseModel):
     """Schema for overall statistics"""
+    model_config = _RESPONSE_CONFIG
+
     total_problems_solved: int = Field(0, ge=0, description="Total number of problems solved")
     total_attempts: int = Field(0, ge=0, description="Total number of attempts")
     easy_solved: int = Field(0, ge=0, description="Number of easy problems solved")
@@ -112,22 +155,28 @@ class OverallStats(BaseModel):
 
 
 # Daily plan schemas
+MIN_PLAN_MINUTES = 15
+MAX_PLAN_MINUTES = 480
+MAX_ESTIMATED_MINUTES = 120
+MAX_CUSTOM_INSTRUCTIONS = 500
+
+
 class ProblemRecommendation(BaseModel):
     """Schema for problem recommendations in daily plans"""
     leetcode_number: int = Field(..., description="LeetCode problem number")
     title: str = Field(..., description="Problem title")
     difficulty: DifficultyEnum = Field(..., description="Problem difficulty")
     reason: str = Field(..., description="AI's reason for recommending this problem")
-    estimated_minutes: int = Field(..., ge=1, le=120, description="Estimated time to solve in minutes")
+    estimated_minutes: int = Field(..., ge=1, le=MAX_ESTIMATED_MINUTES, description="Estimated time to solve in minutes")
     leetcode_url: str = Field(..., description="URL to the problem on LeetCode")
 
 
 class DailyPlanBase(BaseModel):
     """Base schema for daily plans"""
     plan_date: date = Field(..., description="Date for the study plan")
-    available_time_minutes: int = Field(..., ge=15, le=480, description="Available study time in minutes")
+    available_time_minutes: int = Field(..., ge=MIN_PLAN_MINUTES, le=MAX_PLAN_MINUTES, description="Available study time in minutes")
     focus_topic: str = Field(..., min_length=1, description="Main topic to focus on")
-    recommendations: List[ProblemRecommendation] = Field(..., min_items=1, description="List of recommended problems")
+    recommendations: List[ProblemRecommendation] = Field(..., min_length=1, description="List of recommended problems")
     ai_rationale: str = Field(..., min_length=10, description="AI's explanation for the plan")
 
 
@@ -141,16 +190,15 @@ class DailyPlan(DailyPlanBase):
     id: int
     created_at: datetime
     is_cached: bool = Field(False, description="Whether this plan was cached or newly generated")
-    
-    class Config:
-        from_attributes = True
+
+    model_config = _RESPONSE_CONFIG
 
 
 class DailyPlanRequest(BaseModel):
     """Schema for daily plan generation request"""
     date: Optional[date] = None
-    time_minutes: int = Field(..., ge=15, le=480)
-    custom_instructions: Optional[str] = Field(None, max_length=500)
+    time_minutes: int = Field(..., ge=MIN_PLAN_MINUTES, le=MAX_PLAN_MINUTES)
+    custom_instructions: Optional[str] = Field(None, max_length=MAX_CUSTOM_INSTRUCTIONS)
 
 
 class TopicsDecision(BaseModel):
@@ -169,8 +217,8 @@ class TopicsPreviewResponse(BaseModel):
 class ConfirmPlanRequest(BaseModel):
     """Request body to confirm and generate plan (Prompt 2)."""
     date: Optional[date] = None
-    time_minutes: int = Field(..., ge=15, le=480)
-    custom_instructions: Optional[str] = Field(None, max_length=500)
+    time_minutes: int = Field(..., ge=MIN_PLAN_MINUTES, le=MAX_PLAN_MINUTES)
+    custom_instructions: Optional[str] = Field(None, max_length=MAX_CUSTOM_INSTRUCTIONS)
     decision: TopicsDecision
 
 
@@ -180,14 +228,14 @@ class SyncResponse(BaseModel):
     new_problems: int = Field(0, ge=0, description="Number of new problems added")
     new_submissions: int = Field(0, ge=0, description="Number of new submissions added")
     message: str = Field(..., description="Sync operation result message")
-    sync_timestamp: datetime = Field(default_factory=datetime.utcnow, description="When the sync was performed")
+    sync_timestamp: datetime = Field(default_factory=_now, description="When the sync was performed")
 
 
 class ErrorResponse(BaseModel):
     """Schema for error responses"""
     error: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Additional error details")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="When the error occurred")
+    timestamp: datetime = Field(default_factory=_now, description="When the error occurred")
 
 
 # Health check schema
@@ -195,4 +243,4 @@ class HealthCheck(BaseModel):
     """Schema for health check response"""
     status: str = Field(..., description="Service status")
     database_connected: bool = Field(..., description="Whether database is connected")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Health check timestamp")
+    timestamp: datetime = Field(default_factory=_now, description="Health check timestamp")